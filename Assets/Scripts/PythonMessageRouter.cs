@@ -127,6 +127,12 @@ public class PythonMessageRouter : MonoBehaviour
         }
 
         // タグ解析と振り分け
+        // [[TIMING]]: レイテンシ計測ログ（Console確認用、UIには表示しない）
+        if (line.Contains("[[TIMING]]"))
+        {
+            return;
+        }
+
         // [[CAPTURE_DONE]]: キャプチャ完了 → Scanning状態へ遷移
         if (line.Contains("[[CAPTURE_DONE]]"))
         {
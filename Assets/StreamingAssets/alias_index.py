@@ -0,0 +1,226 @@
+"""
+alias_index.py - エイリアス辞書の多パターン照合（Aho-Corasick）
+
+アイテム名に含まれるエイリアスを1パスで全て列挙し、
+最も長い（= 最も具体的な）エイリアスを選ぶ。
+構築はインポート時に1回だけ行い、照合コストは入力文字列長に比例する
+（エイリアス数が数千になっても照合時間はほぼ一定）。
+
+- 日本語・英語の両方に対応（NFKC正規化・カタカナ→ひらがな）
+- 英語のエイリアスは単語境界でのみ一致（"pen" は "open" に一致しない）
+- 日本語のエイリアスは、両端が同じ種類のかなに続いていない場合のみ一致
+  （"ペン" は "ペンギン"、"ノート" は "ノートパソコン" に一致しない。
+  "赤いペン"（ひらがな→カタカナ）や "ペン立て"（カタカナ→漢字）は一致する）
+- 英語の複数形 (-s / -es) を許容
+"""
+
+import re
+import unicodedata
+from collections import deque
+
+_SEPARATORS = re.compile(r"[\s_\-・/]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    照合用に文字列を正規化する
+
+    - NFKC正規化（全角英数→半角、半角カナ→全角カナ）
+    - 小文字化
+    - カタカナ→ひらがな
+    - 空白・区切り記号を半角スペース1つに統一
+    """
+    return _normalize(text)[0]
+
+
+def _normalize(text: str):
+    """
+    normalize_text と同じ正規化を行い、各文字の元の種類も返す
+
+    Returns:
+        tuple: (正規化後の文字列, [文字ごとの種類 "katakana" / "hiragana" / None])
+               長音記号「ー」は直前の文字と同じ種類として扱う
+    """
+    text = _SEPARATORS.sub(" ", unicodedata.normalize("NFKC", text).lower()).strip()
+    chars = []
+    kinds = []
+    for c in text:
+        if "ァ" <= c <= "ヶ":
+            chars.append(chr(ord(c) - 0x60))
+            kinds.append("katakana")
+            continue
+        chars.append(c)
+        if "ぁ" <= c <= "ゖ":
+            kinds.append("hiragana")
+        elif c == "ー":
+            kinds.append(kinds[-1] if kinds else None)
+        else:
+            kinds.append(None)
+    return "".join(chars), kinds
+
+
+def _guess_kinds(normalized: str) -> list:
+    """正規化済み文字列のみが与えられた場合の文字の種類（元のカタカナ/ひらがなは区別できない）"""
+    kinds = []
+    for c in normalized:
+        if "ぁ" <= c <= "ゖ":
+            kinds.append("hiragana")
+        elif c == "ー":
+            kinds.append(kinds[-1] if kinds else None)
+        else:
+            kinds.append(None)
+    return kinds
+
+
+def _is_ascii(text: str) -> bool:
+    return all(ord(c) < 128 for c in text)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+class AliasIndex:
+    """Aho-Corasick オートマトンによるエイリアス照合"""
+
+    def __init__(self, aliases: dict):
+        """
+        Args:
+            aliases: エイリアス → 値 の辞書（キーは正規化して登録。重複時は先勝ち）
+        """
+        self.values = {}
+        for alias, value in aliases.items():
+            key = normalize_text(alias)
+            if not key:
+                continue
+            self.values.setdefault(key, value)
+            # "pencil case" / "pencilcase" の揺れに対応
+            self.values.setdefault(key.replace(" ", ""), value)
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for key in self.values:
+            self._insert(key)
+        self._build_failure_links()
+
+    def __len__(self):
+        return len(self.values)
+
+    def _insert(self, key):
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(key)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, normalized: str, kinds=None) -> list:
+        """
+        正規化済み文字列に含まれる全エイリアスを列挙する（単語境界チェック済み）
+
+        Args:
+            normalized: normalize_text 済みの文字列
+            kinds: 文字ごとの元の種類（_normalize の戻り値。省略時はかなを全てひらがな扱い）
+
+        Returns:
+            list: [(start, end, alias), ...]
+        """
+        if kinds is None:
+            kinds = _guess_kinds(normalized)
+        matches = []
+        node = 0
+        for i, ch in enumerate(normalized):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for alias in self._out[node]:
+                start = i + 1 - len(alias)
+                end = i + 1
+                if self._on_word_boundary(normalized, kinds, start, end, alias):
+                    matches.append((start, end, alias))
+        return matches
+
+    @staticmethod
+    def _on_word_boundary(text, kinds, start, end, alias):
+        if not _is_ascii(alias):
+            # 同じ種類のかなが前後に続く場合は別の語の一部（ぺん|ぎん、のーと|ぱそこん）
+            if start > 0 and kinds[start - 1] is not None and kinds[start - 1] == kinds[start]:
+                return False
+            if end < len(text) and kinds[end] is not None and kinds[end] == kinds[end - 1]:
+                return False
+            return True
+        if start > 0 and _is_word_char(text[start - 1]):
+            return False
+        # 複数形 (-s / -es) を許容
+        for suffix in ("", "s", "es"):
+            if text.startswith(suffix, end):
+                tail = end + len(suffix)
+                if tail >= len(text) or not _is_word_char(text[tail]):
+                    return True
+        return False
+
+    def lookup(self, text: str):
+        """
+        最も具体的なエイリアスを選んで返す
+
+        優先順位:
+            1. 完全一致（空白なし表記も含む）
+            2. 最長のエイリアス（同じ長さなら後ろにある方 = 英語の主要語）
+
+        Returns:
+            dict: マッチ診断情報（マッチしなければNone）
+                - input / normalized: 入力と正規化後の文字列
+                - alias: 採用したエイリアス
+                - value: エイリアスに対応する値
+                - method: "exact" または "partial"
+                - span: 正規化後文字列内の位置 (start, end)
+                - candidates: 一致した全エイリアス
+        """
+        if not text:
+            return None
+
+        normalized, kinds = _normalize(text)
+        for candidate in (normalized, normalized.replace(" ", "")):
+            if candidate in self.values:
+                return {
+                    "input": text,
+                    "normalized": normalized,
+                    "alias": candidate,
+                    "value": self.values[candidate],
+                    "method": "exact",
+                    "span": (0, len(normalized)),
+                    "candidates": [candidate],
+                }
+
+        matches = self.find_all(normalized, kinds)
+        if not matches:
+            return None
+
+        start, end, alias = max(matches, key=lambda m: (m[1] - m[0], m[0]))
+        return {
+            "input": text,
+            "normalized": normalized,
+            "alias": alias,
+            "value": self.values[alias],
+            "method": "partial",
+            "span": (start, end),
+            "candidates": sorted({m[2] for m in matches}, key=len, reverse=True),
+        }
@@ -0,0 +1,116 @@
+"""
+archive_writer.py - 画像保存のバックグラウンド書き込み
+
+raw画像（フル解像度JPEG）や処理済みPNGのエンコード・書き込みを専用スレッドで行い、
+YOLO / rembg / Ollama の推論と並行させる。
+
+- 上限付きキュー（満杯時は投入側がブロックする。保存を捨てない）
+- 一時ファイルに書いてから os.replace で置き換える（読み手に書きかけのファイルを見せない）
+- submit() は concurrent.futures.Future を返す（完了を待ちたい場合のみ result() を呼ぶ）
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveWriter:
+    """画像を非同期にファイルへ保存するライター"""
+
+    def __init__(self, maxsize=8, fsync=False):
+        """
+        Args:
+            maxsize: 書き込み待ちキューの上限
+            fsync: Trueの場合、置き換え前に os.fsync でディスクへ確実に書き出す
+        """
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.fsync = fsync
+        self._thread = None
+
+    def start(self):
+        """書き込みスレッドを開始"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path, image, params=None) -> Future:
+        """
+        画像の保存を予約する（キューが満杯なら空くまで待つ）
+
+        Args:
+            path: 保存先（拡張子でフォーマットを決定）
+            image: 画像 (numpy array)。保存完了まで変更しないこと
+            params: cv2.imencode のパラメータ（例: [cv2.IMWRITE_JPEG_QUALITY, 90]）
+
+        Returns:
+            Future: 完了時に path を返す（失敗時は例外）
+        """
+        future = Future()
+        if self.queue.full():
+            logger.warning(f"[[ARCHIVE]] Queue full ({self.queue.maxsize}), waiting...")
+        self.queue.put((future, path, image, params))
+        depth = self.qsize()
+        if depth > 1:
+            logger.info(f"[[ARCHIVE]] Queue depth: {depth}")
+        return future
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def flush(self, timeout=None):
+        """
+        キューに残っている保存が全て終わるまで待つ（終了時用）
+
+        Returns:
+            bool: timeout 内に全て書き終えたか
+        """
+        done = threading.Event()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            # キューが満杯でも timeout を超えて待たない
+            self.queue.put((None, None, None, done), timeout=timeout)
+        except queue.Full:
+            logger.warning(f"[[ARCHIVE]] Flush timed out with {self.qsize()} writes pending")
+            return False
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        return done.wait(remaining)
+
+    def _run(self):
+        while True:
+            future, path, image, params = self.queue.get()
+            if future is None:
+                # flush() のマーカー
+                params.set()
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._write(path, image, params)
+                future.set_result(path)
+            except Exception as e:
+                logger.error(f"[[ARCHIVE]] Failed to save {path}: {e}")
+                traceback.print_exc()
+                future.set_exception(e)
+
+    def _write(self, path, image, params):
+        ext = os.path.splitext(path)[1]
+        ok, encoded = cv2.imencode(ext, image, params or [])
+        if not ok:
+            raise RuntimeError(f"imencode failed for {ext}")
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded.tobytes())
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
@@ -0,0 +1,268 @@
+"""
+background_remover.py - rembgによる背景除去
+
+rembgのセッション（ONNXモデル）を起動時に1回だけ作成し、
+numpy arrayのまま入出力する。PNGエンコード/デコードの往復は行わない。
+
+- 入力: BGR画像 (numpy array)
+- 出力: BGRA画像 (numpy array、アルファ = 前景マスク)
+
+低解像度マスクモード (mask_long_side):
+- 長辺を mask_long_side px に縮小した画像でマスクを推論
+- ガイデッドフィルタの係数を縮小画像上で求め、元解像度へ拡大して
+  元画像をガイドにエッジを復元（Fast Guided Filter）
+
+YOLO ROIモード (roi_boxes):
+- YOLOの検出ボックスの統合領域 + マージンの内側だけを推論
+- 領域外のピクセルは背景（アルファ0）として扱う
+"""
+
+import cv2
+import numpy as np
+import logging
+import time
+from rembg import new_session, remove
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRemover:
+    """rembgセッションを保持する背景除去クラス"""
+
+    def __init__(self, model_name="u2net", mask_long_side=None, refine_edges=True,
+                 refine_radius=4, refine_eps=1e-3, roi_margin_ratio=0.1):
+        """
+        Args:
+            model_name: rembgのモデル名 (u2net, u2netp, isnet-general-use など)
+            mask_long_side: マスク推論時の長辺サイズ（Noneで元解像度のまま推論）
+            refine_edges: 低解像度マスクを拡大する際にガイデッドフィルタでエッジを補正するか
+            refine_radius: ガイデッドフィルタの半径（縮小画像上のpx）
+            refine_eps: ガイデッドフィルタの正則化係数（小さいほどエッジに追従）
+            roi_margin_ratio: ROIモードで検出ボックスの統合領域に加えるマージン比率
+        """
+        self.model_name = model_name
+        self.mask_long_side = mask_long_side
+        self.refine_edges = refine_edges
+        self.refine_radius = refine_radius
+        self.refine_eps = refine_eps
+        self.roi_margin_ratio = roi_margin_ratio
+        self.session = None
+        self._is_initialized = False
+
+    def initialize(self):
+        """セッションを作成（初回のみ）"""
+        if self._is_initialized:
+            return True
+
+        logger.info(f"[rembg] Creating session: {self.model_name}")
+        try:
+            self.session = new_session(self.model_name)
+            self._is_initialized = True
+            logger.info("[rembg] Session ready")
+            return True
+        except Exception as e:
+            logger.error(f"[rembg] Failed to create session: {e}")
+            return False
+
+    def warmup(self):
+        """
+        セッション作成とダミー推論を行う（初回来場者の待ち時間対策）
+        """
+        if not self.initialize():
+            return False
+        dummy = np.zeros((64, 64, 3), dtype=np.uint8)
+        self.compute_mask(dummy)
+        logger.info("[rembg] Warm-up complete")
+        return True
+
+    def compute_mask(self, image: np.ndarray, roi_boxes=None) -> np.ndarray:
+        """
+        前景マスクを計算する
+
+        Args:
+            image: 入力画像 (BGR形式のnumpy array)
+            roi_boxes: 画像座標の検出ボックス [(x1, y1, x2, y2), ...]。
+                       指定時はその統合領域 + マージンの内側のみ推論する
+
+        Returns:
+            numpy.ndarray: 前景マスク (uint8, 入力と同じ高さ・幅)
+        """
+        if roi_boxes:
+            x1, y1, x2, y2 = self._roi_from_boxes(roi_boxes, image.shape[1], image.shape[0])
+            if x2 > x1 and y2 > y1:
+                mask = np.zeros(image.shape[:2], dtype=np.uint8)
+                mask[y1:y2, x1:x2] = self._compute_region_mask(image[y1:y2, x1:x2])
+                return mask
+            logger.warning("[rembg] ROI is empty, falling back to whole image")
+
+        return self._compute_region_mask(image)
+
+    def _roi_from_boxes(self, boxes, width, height):
+        """検出ボックスの統合領域にマージンを加え、画像内にクリップする"""
+        x1 = min(int(b[0]) for b in boxes)
+        y1 = min(int(b[1]) for b in boxes)
+        x2 = max(int(b[2]) for b in boxes)
+        y2 = max(int(b[3]) for b in boxes)
+
+        margin_x = int((x2 - x1) * self.roi_margin_ratio)
+        margin_y = int((y2 - y1) * self.roi_margin_ratio)
+        return (max(0, x1 - margin_x), max(0, y1 - margin_y),
+                min(width, x2 + margin_x), min(height, y2 + margin_y))
+
+    def _compute_region_mask(self, image: np.ndarray) -> np.ndarray:
+        """画像全体のマスクを推論（必要に応じて低解像度で推論）"""
+        h, w = image.shape[:2]
+        long_side = max(h, w)
+        if not self.mask_long_side or long_side <= self.mask_long_side:
+            return self._predict_mask(image)
+
+        # 縮小画像でマスクを推論
+        scale = self.mask_long_side / long_side
+        small_size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        small = cv2.resize(image, small_size, interpolation=cv2.INTER_AREA)
+        small_mask = self._predict_mask(small)
+
+        if not self.refine_edges:
+            return cv2.resize(small_mask, (w, h), interpolation=cv2.INTER_LINEAR)
+
+        # 元解像度へ拡大しつつエッジを補正
+        return self._upsample_with_guide(image, small, small_mask)
+
+    def _predict_mask(self, image: np.ndarray) -> np.ndarray:
+        """rembgで入力と同じサイズのマスクを推論"""
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        mask = remove(rgb, session=self.session, only_mask=True)
+        if mask.ndim == 3:
+            mask = mask[:, :, 0]
+        return mask
+
+    def _upsample_with_guide(self, image, small, small_mask):
+        """
+        Fast Guided Filter: 線形係数 (a, b) を縮小画像上で求めて拡大し、
+        元解像度のグレー画像 I に対して q = a * I + b を適用する
+        """
+        h, w = image.shape[:2]
+        ksize = (2 * self.refine_radius + 1, 2 * self.refine_radius + 1)
+
+        guide_small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32) / 255.0
+        p = small_mask.astype(np.float32) / 255.0
+
+        mean_i = cv2.boxFilter(guide_small, -1, ksize)
+        mean_p = cv2.boxFilter(p, -1, ksize)
+        corr_ip = cv2.boxFilter(guide_small * p, -1, ksize)
+        corr_ii = cv2.boxFilter(guide_small * guide_small, -1, ksize)
+
+        var_i = corr_ii - mean_i * mean_i
+        cov_ip = corr_ip - mean_i * mean_p
+        a = cov_ip / (var_i + self.refine_eps)
+        b = mean_p - a * mean_i
+
+        mean_a = cv2.resize(cv2.boxFilter(a, -1, ksize), (w, h), interpolation=cv2.INTER_LINEAR)
+        mean_b = cv2.resize(cv2.boxFilter(b, -1, ksize), (w, h), interpolation=cv2.INTER_LINEAR)
+
+        # 0-255スケールのまま適用: q*255 = a * I255 + b * 255
+        guide = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        q = mean_a * guide + mean_b * 255.0
+        return np.clip(q, 0, 255).astype(np.uint8)
+
+    def remove(self, image: np.ndarray, roi_boxes=None) -> np.ndarray:
+        """
+        背景を除去してBGRA画像を返す
+
+        Args:
+            image: 入力画像 (BGR形式のnumpy array)
+            roi_boxes: 画像座標の検出ボックス（compute_mask参照）
+
+        Returns:
+            numpy.ndarray: BGRA画像（失敗時は例外を送出）
+        """
+        if not self._is_initialized:
+            if not self.initialize():
+                raise RuntimeError("rembg session initialization failed")
+
+        mask = self.compute_mask(image, roi_boxes)
+        b, g, r = cv2.split(image)
+        return cv2.merge([b, g, r, mask])
+
+
+def compare_masks(reference: np.ndarray, candidate: np.ndarray, threshold=128) -> dict:
+    """
+    2つのマスクの品質比較
+
+    Returns:
+        dict: iou（二値化後のIoU）, mae（平均絶対誤差 0-255）,
+              edge_mae（参照マスクの境界付近のみの平均絶対誤差）
+    """
+    ref_bin = reference >= threshold
+    cand_bin = candidate >= threshold
+    union = np.count_nonzero(ref_bin | cand_bin)
+    iou = float(np.count_nonzero(ref_bin & cand_bin) / union) if union else 1.0
+
+    diff = cv2.absdiff(reference, candidate)
+    # 境界付近（参照マスクのモルフォロジー勾配）
+    edge = cv2.morphologyEx(ref_bin.astype(np.uint8), cv2.MORPH_GRADIENT, np.ones((5, 5), np.uint8)) > 0
+    edge_mae = float(diff[edge].mean()) if np.any(edge) else 0.0
+
+    return {"iou": iou, "mae": float(diff.mean()), "edge_mae": edge_mae}
+
+
+def compare_mask_resolutions(image: np.ndarray, long_sides=(320, 512), model_name="u2net") -> list:
+    """
+    元解像度マスク（従来出力）と低解像度マスクの品質・処理時間を比較する
+    """
+    reference_remover = BackgroundRemover(model_name=model_name)
+    reference_remover.warmup()
+
+    start = time.perf_counter()
+    reference = reference_remover.compute_mask(image)
+    results = [{"mask_long_side": None, "seconds": time.perf_counter() - start,
+                "iou": 1.0, "mae": 0.0, "edge_mae": 0.0}]
+
+    for long_side in long_sides:
+        for refine in (False, True):
+            remover = BackgroundRemover(model_name=model_name, mask_long_side=long_side, refine_edges=refine)
+            remover.session = reference_remover.session
+            remover._is_initialized = True
+
+            start = time.perf_counter()
+            mask = remover.compute_mask(image)
+            elapsed = time.perf_counter() - start
+
+            result = {"mask_long_side": long_side, "refine_edges": refine, "seconds": elapsed}
+            result.update(compare_masks(reference, mask))
+            results.append(result)
+    return results
+
+
+# モジュールテスト用
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    print("=== Background Remover テスト ===")
+
+    import sys
+    if len(sys.argv) > 2 and sys.argv[2] == "--compare":
+        # 品質比較: python background_remover.py <image_path> --compare [long_side ...]
+        img = cv2.imread(sys.argv[1])
+        if img is None:
+            print(f"Failed to load: {sys.argv[1]}")
+            sys.exit(1)
+        long_sides = [int(v) for v in sys.argv[3:]] or [320, 512]
+        print(f"Input: {img.shape[1]}x{img.shape[0]}")
+        for r in compare_mask_resolutions(img, long_sides):
+            label = "full-res" if r["mask_long_side"] is None else \
+                f"{r['mask_long_side']}px{' +refine' if r['refine_edges'] else ''}"
+            print(f"  {label:<14} {r['seconds'] * 1000:8.1f} ms  IoU={r['iou']:.4f}  "
+                  f"MAE={r['mae']:.2f}  edgeMAE={r['edge_mae']:.2f}")
+    elif len(sys.argv) > 1:
+        img = cv2.imread(sys.argv[1])
+        if img is not None:
+            remover = BackgroundRemover()
+            remover.warmup()
+            result = remover.remove(img)
+            cv2.imwrite("rembg_result.png", result)
+            print("Saved: rembg_result.png")
+        else:
+            print(f"Failed to load: {sys.argv[1]}")
+    else:
+        print("Usage: python background_remover.py <image_path> [--compare [long_side ...]]")
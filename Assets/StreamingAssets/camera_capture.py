@@ -2,10 +2,17 @@
 camera_capture.py - カメラ制御モジュール
 
 フリッカー対策付きのカメラ撮影機能を提供。
-- 複数フレームの中央値を取ることでフリッカーを軽減
+- 複数フレームの中央値を取ることでフリッカーを軽減（temporal_filter.TemporalFilter）
 - カメラの露出安定を待ってから撮影
-- OBS等の仮想カメラを自動除外（macOS対応）
+- OBS等の仮想カメラを自動除外（macOS対応、検出結果は camera_registry でキャッシュ）
 - OBS仮想カメラプロセスを自動終了（macOS）
+- CameraPool: 複数カメラを開いたまま保持し、インデックス切り替えを参照の差し替えにする
+- 常時取得スレッド（オプション）: 直近Nフレームを事前確保したリングバッファに
+  書き込み続け、撮影要求時は安定済みのフレームを即座に取り出す
+- 適応ウォームアップ: 輝度平均とヒストグラムのフレーム間変化が閾値未満になったら
+  ウォームアップを打ち切る（warmup_frames は上限）
+- 静止待ち撮影（常時取得時のみ）: 低解像度の差分で動きを監視し、
+  直近Kフレームが静止したら撮影する（固定のウォームアップ待ちの代わり）
 """
 
 import cv2
@@ -13,13 +20,28 @@ import numpy as np
 import logging
 import subprocess
 import sys
+import threading
 import time
 
+from camera_registry import default_registry
+from temporal_filter import TemporalFilter
+
 logger = logging.getLogger(__name__)
 
 # 除外するカメラ名のキーワード（大文字小文字無視）
 EXCLUDED_CAMERA_KEYWORDS = ["obs", "virtual", "screen capture"]
 
+# キャプチャプロファイル（解像度・FOURCC・FPSの要求値）
+# "max" は従来通りセンサー最大解像度を要求する（USBカメラでは非圧縮・低FPSになりやすい）
+CAPTURE_PROFILES = {
+    "max": {"width": 9999, "height": 9999, "fourcc": None, "fps": None},
+    "4k_mjpg": {"width": 3840, "height": 2160, "fourcc": "MJPG", "fps": 30},
+    "1080p_mjpg": {"width": 1920, "height": 1080, "fourcc": "MJPG", "fps": 30},
+    "720p_mjpg": {"width": 1280, "height": 720, "fourcc": "MJPG", "fps": 30},
+    "1080p_yuyv": {"width": 1920, "height": 1080, "fourcc": "YUYV", "fps": 5},
+    "720p_yuyv": {"width": 1280, "height": 720, "fourcc": "YUYV", "fps": 10},
+}
+
 # 自動終了するプロセス名のパターン
 KILL_PROCESS_PATTERNS = [
     "obs-studio.mac-camera-extension",
@@ -57,119 +79,22 @@ def kill_virtual_camera_processes():
 kill_virtual_camera_processes()
 
 
-def get_macos_cameras():
-    """
-    macOSでカメラデバイス名とインデックスのマッピングを取得
-    Returns: list of dict [{"index": int, "name": str}, ...]
-    """
-    if sys.platform != "darwin":
-        return []
-    
-    try:
-        result = subprocess.run(
-            ["system_profiler", "SPCameraDataType", "-json"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        import json
-        data = json.loads(result.stdout)
-        cameras = []
-        
-        if "SPCameraDataType" in data:
-            for i, cam in enumerate(data["SPCameraDataType"]):
-                name = cam.get("_name", f"Camera {i}")
-                cameras.append({"index": i, "name": name})
-                logger.info(f"macOS カメラ検出: Index {i} = {name}")
-        
-        return cameras
-    except Exception as e:
-        logger.warning(f"macOSカメラ情報の取得に失敗: {e}")
-        return []
-
-
-def find_physical_camera_index(exclude_keywords=EXCLUDED_CAMERA_KEYWORDS):
+def find_physical_camera_index(exclude_keywords=EXCLUDED_CAMERA_KEYWORDS, rescan=False):
     """
     仮想カメラを除外して物理カメラのインデックスを検索
     
-    OpenCVでカメラをスキャンし、FPSと解像度から物理カメラを判別。
-    macOSのカメラ情報も参照して確実に仮想カメラを除外する。
+    camera_registry のキャッシュを参照し、デバイス構成が変わっていなければ
+    カメラを開かずに返す。キャッシュがない・ホットプラグがあった場合は
+    候補を並列にプローブし、FPSと解像度、macOSのカメラ名から物理カメラを判別する。
+    
+    Args:
+        exclude_keywords: 仮想カメラとみなす名前のキーワード
+        rescan: Trueでキャッシュを無視して再スキャン
     
     Returns:
-        int: 物理カメラのインデックス、見つからない場合は0
+        int: 物理カメラのインデックス、見つからない場合は1
     """
-    # まずmacOSのカメラ名マッピングを取得（参考情報）
-    macos_cameras = get_macos_cameras()
-    camera_names = {}
-    for cam in macos_cameras:
-        camera_names[cam["index"]] = cam["name"]
-    
-    # OBS仮想カメラのインデックスを特定
-    excluded_indices = set()
-    for idx, name in camera_names.items():
-        name_lower = name.lower()
-        if any(kw in name_lower for kw in exclude_keywords):
-            excluded_indices.add(idx)
-            logger.info(f"[[CAMERA]] 仮想カメラを除外リストに追加: {name} (Index {idx})")
-    
-    # OpenCVでカメラをスキャン
-    logger.info("[[CAMERA]] OpenCVでカメラをスキャン中...")
-    candidates = []
-    
-    # macOSカメラ情報がある場合は、その情報に基づいてスキャン範囲を決定
-    if macos_cameras:
-        # 検出されたカメラのインデックスのみをスキャン（存在しないデバイスへのアクセスを避ける）
-        scan_indices = [cam["index"] for cam in macos_cameras if cam["index"] not in excluded_indices]
-        logger.info(f"[[CAMERA]] macOSカメラ情報に基づきスキャン: {scan_indices}")
-    else:
-        # macOSカメラ情報が取得できない場合はフォールバック（0-2のみ）
-        scan_indices = [i for i in range(3) if i not in excluded_indices]
-        logger.info(f"[[CAMERA]] フォールバックモード: インデックス {scan_indices} をスキャン")
-    
-    for i in scan_indices:
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            
-            # 追加チェック: 実際にフレームが取れるか
-            ret, _ = cap.read()
-            cap.release()
-            
-            if not ret:
-                logger.info(f"[[CAMERA]] Index {i}: フレーム取得失敗、スキップ")
-                continue
-            
-            name = camera_names.get(i, f"Unknown Camera {i}")
-            
-            # OBS仮想カメラの特徴: 
-            # - FPSが0または非常に低い（30未満）場合がある
-            # - 名前に "OBS" や "Virtual" が含まれる
-            is_likely_virtual = fps < 5 or any(kw in name.lower() for kw in exclude_keywords)
-            
-            if is_likely_virtual:
-                logger.info(f"[[CAMERA]] Index {i} は仮想カメラの可能性大（FPS={fps}, name={name}）、スキップ")
-                continue
-            
-            logger.info(f"[[CAMERA]] 物理カメラ候補: Index {i} = {name} ({width:.0f}x{height:.0f} @ {fps:.1f}fps)")
-            candidates.append({
-                "index": i,
-                "name": name,
-                "fps": fps,
-                "width": width,
-                "height": height
-            })
-    
-    if not candidates:
-        logger.warning("[[CAMERA]] 物理カメラが見つかりません。Index 1を試します。")
-        # OBS Virtual Cameraが Index 0 で、物理カメラが Index 1 の場合が多い
-        return 1
-    
-    # 最高解像度のカメラを優先（物理カメラは通常高解像度）
-    best = max(candidates, key=lambda c: c["width"] * c["height"])
-    logger.info(f"[[CAMERA]] 選択: Index {best['index']} = {best['name']}")
-    return best["index"]
+    return default_registry().find_physical_index(exclude_keywords, rescan=rescan)
 
 
 class CameraCapture:
@@ -177,7 +102,12 @@ class CameraCapture:
     
     def __init__(self, camera_index=None, width=9999, height=9999, auto_detect=True, 
                  exposure=-30, contrast=35, saturation=None, brightness=15,
-                 gain=0, white_balance=None):
+                 gain=0, white_balance=None, background_grabber=False, ring_size=8,
+                 max_frame_age=0.5, temporal_filter="median", profile=None,
+                 fourcc=None, fps=None, stability_gate=False, stable_frames=5,
+                 motion_threshold=2.0, stability_timeout=3.0, motion_width=64,
+                 adaptive_warmup=False, luminance_threshold=1.0, histogram_threshold=0.05,
+                 settled_checks=2, min_warmup_brightness=20.0):
         """
         マニュアル撮影モード: 全ての自動調整を無効にして手動で設定
         
@@ -192,6 +122,26 @@ class CameraCapture:
             brightness: 明るさ（デフォルト: 35）
             gain: ゲイン/ISO感度（高いと明るいがノイズ増加。Noneでデフォルト）
             white_balance: ホワイトバランス色温度（2000-10000K程度。Noneでデフォルト）
+            background_grabber: Trueの場合、初期化後に常時取得スレッドを起動し、
+                                リングバッファから即座に撮影する
+            ring_size: リングバッファのフレーム数（撮影フレーム数より大きくする）
+            max_frame_age: 常時取得モードで最新フレームとして許容する経過秒数
+            temporal_filter: フレーム合成方法（"median" または "trimmed_mean"）
+            profile: CAPTURE_PROFILES のキー。指定時は width / height / fourcc / fps を上書き
+            fourcc: 要求するピクセルフォーマット（"MJPG", "YUYV" など。Noneでデバイス既定）
+            fps: 要求するフレームレート（Noneでデバイス既定）
+            stability_gate: Trueの場合（常時取得時のみ）、直近 stable_frames フレームの
+                            動きが motion_threshold 未満になるまで待ってから撮影する
+            stable_frames: 静止とみなす連続フレーム数（K）
+            motion_threshold: 低解像度グレー画像のフレーム間平均差分（0-255）の閾値
+            stability_timeout: 静止待ちの上限（秒）。超えたら最新フレームで撮影する
+            motion_width: 動き検出用に縮小する画像の幅（px）
+            adaptive_warmup: Trueの場合、露出が収束した時点でウォームアップを打ち切る
+            luminance_threshold: 収束とみなす平均輝度のフレーム間変化（0-255）
+            histogram_threshold: 収束とみなすヒストグラムのフレーム間変化（全変動距離 0-1）
+            settled_checks: 収束とみなすのに必要な、変化が閾値未満のフレーム間差分の連続回数
+            min_warmup_brightness: 収束とみなす最低の平均輝度（0-255）。起動直後の真っ黒な
+                                   同一フレームを収束と誤判定しないため
         """
         if camera_index is None and auto_detect:
             self.camera_index = find_physical_camera_index()
@@ -199,16 +149,53 @@ class CameraCapture:
         else:
             self.camera_index = camera_index if camera_index is not None else 0
             
+        if profile is not None:
+            if profile not in CAPTURE_PROFILES:
+                raise ValueError(f"Unknown capture profile: {profile}")
+            width, height = CAPTURE_PROFILES[profile]["width"], CAPTURE_PROFILES[profile]["height"]
+            fourcc, fps = CAPTURE_PROFILES[profile]["fourcc"], CAPTURE_PROFILES[profile]["fps"]
+        self.profile = profile
         self.width = width
         self.height = height
+        self.fourcc = fourcc
+        self.fps = fps
+        # デバイスが実際に受け入れた値（initialize後に設定）
+        self.granted = None
         self.exposure = exposure
         self.contrast = contrast
         self.saturation = saturation
         self.brightness = brightness
         self.gain = gain
         self.white_balance = white_balance
+        self.background_grabber = background_grabber
+        self.ring_size = ring_size
+        self.max_frame_age = max_frame_age
+        self.temporal_filter = TemporalFilter(temporal_filter)
+        self.stability_gate = stability_gate
+        self.stable_frames = stable_frames
+        self.motion_threshold = motion_threshold
+        self.stability_timeout = stability_timeout
+        self.motion_width = motion_width
+        self.adaptive_warmup = adaptive_warmup
+        self.luminance_threshold = luminance_threshold
+        self.histogram_threshold = histogram_threshold
+        self.settled_checks = settled_checks
+        self.min_warmup_brightness = min_warmup_brightness
+        # 直近の静止待ち時間（秒）。静止待ちしなかった場合はNone
+        self.last_stability_wait = None
         self.cap = None
         self._is_initialized = False
+
+        # 常時取得スレッドの状態（リングバッファは初回フレームのサイズで確保）
+        self._ring = None
+        self._ring_times = None
+        self._ring_motion = None
+        self._settled_at = None
+        self._warmup_logged = False
+        self._frame_count = 0
+        self._grabber_thread = None
+        self._grabber_running = False
+        self._frame_cond = threading.Condition()
     
     def initialize(self):
         """カメラを初期化（マニュアルモード）"""
@@ -223,9 +210,13 @@ class CameraCapture:
             logger.error("カメラを開けませんでした")
             return False
         
-        # 解像度設定
+        # フォーマット・解像度・FPSの要求（FOURCCは解像度より先に設定する）
+        if self.fourcc is not None:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps is not None:
+            self.cap.set(cv2.CAP_PROP_FPS, self.fps)
         
         # === マニュアルモード: 全ての自動調整を無効化 ===
         
@@ -276,18 +267,218 @@ class CameraCapture:
         time.sleep(0.5)
         
         # 初回フレーム取得でカメラを完全に起動
+        first_frame = None
         for attempt in range(3):
-            ret, _ = self.cap.read()
+            ret, first_frame = self.cap.read()
             if ret:
                 logger.info("[[CAMERA]] カメラ準備完了")
                 break
             time.sleep(0.2)
         else:
             logger.warning("[[CAMERA]] 初回フレーム取得に失敗（継続）")
+
+        self.granted = self._report_granted(first_frame if ret else None)
         
         self._is_initialized = True
+
+        if self.background_grabber:
+            self.start_grabber()
         return True
 
+    def _report_granted(self, frame):
+        """
+        要求した解像度・FOURCC・FPSと、デバイスが実際に受け入れた値をログに出す
+
+        Returns:
+            dict: {"width", "height", "fourcc", "fps"}（解像度は実フレームを優先）
+        """
+        code = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        granted_fourcc = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ") or None
+        if frame is not None:
+            granted_h, granted_w = frame.shape[:2]
+        else:
+            granted_w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            granted_h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        granted = {
+            "width": granted_w,
+            "height": granted_h,
+            "fourcc": granted_fourcc,
+            "fps": self.cap.get(cv2.CAP_PROP_FPS),
+        }
+
+        requested = f"{self.width}x{self.height} {self.fourcc or 'default'} @ {self.fps or 'default'}fps"
+        logger.info(f"[[CAMERA]] プロファイル {self.profile or '(custom)'}: 要求 {requested} -> "
+                    f"取得 {granted['width']}x{granted['height']} {granted['fourcc']} @ {granted['fps']:.1f}fps")
+        if self.fourcc is not None and granted_fourcc != self.fourcc:
+            logger.warning(f"[[CAMERA]] FOURCC {self.fourcc} は受け入れられませんでした（{granted_fourcc}）")
+        return granted
+
+    def start_grabber(self):
+        """常時取得スレッドを開始"""
+        if self._grabber_thread is not None:
+            return
+        with self._frame_cond:
+            self._frame_count = 0
+            self._settled_at = None
+            self._warmup_logged = False
+        self._grabber_running = True
+        self._grabber_thread = threading.Thread(
+            target=self._grab_loop,
+            name=f"camera-grabber-{self.camera_index}",
+            daemon=True
+        )
+        self._grabber_thread.start()
+        logger.info(f"[[CAMERA]] 常時取得スレッド開始 (リング{self.ring_size}フレーム)")
+
+    def stop_grabber(self):
+        """常時取得スレッドを停止（cap.release() の前に呼ぶ）"""
+        if self._grabber_thread is None:
+            return
+        self._grabber_running = False
+        self._grabber_thread.join(timeout=2.0)
+        self._grabber_thread = None
+        logger.info("[[CAMERA]] 常時取得スレッド停止")
+
+    def _grab_loop(self):
+        """
+        リングバッファの次のスロットへ直接デコードし続ける（フレームごとの確保なし）。
+        スロットの書き込みはロック外で行い、書き込み完了後にカウンタを進める。
+        """
+        failures = 0
+        previous_small = None
+        settled_streak = 0
+        while self._grabber_running:
+            slot = self._frame_count % self.ring_size
+            dst = self._ring[slot] if self._ring is not None else None
+            ret, frame = self.cap.read() if dst is None else self.cap.read(dst)
+            if not ret:
+                failures += 1
+                if failures % 30 == 1:
+                    logger.warning(f"[[CAMERA]] 常時取得: フレーム取得失敗 ({failures}回連続)")
+                time.sleep(0.05)
+                continue
+            failures = 0
+
+            if dst is None or frame is not dst:
+                # 初回、または解像度が変わった場合はリングを確保し直す
+                ring = np.empty((self.ring_size,) + frame.shape, dtype=frame.dtype)
+                ring[0] = frame
+                slot = 0
+                with self._frame_cond:
+                    self._ring = ring
+                    self._ring_times = np.zeros(self.ring_size)
+                    self._ring_motion = np.zeros(self.ring_size)
+                    self._frame_count = 0
+                    self._settled_at = None
+                    self._warmup_logged = False
+                previous_small = None
+                settled_streak = 0
+                logger.info(f"[[CAMERA]] リングバッファ確保: {self.ring_size}x{frame.shape}")
+
+            # 動き量: 縮小グレー画像の前フレームとの平均絶対差分（初回は未知 = 最大）
+            small = self._motion_image(frame)
+            motion = 255.0 if previous_small is None else float(cv2.absdiff(small, previous_small).mean())
+            settled = False
+            if self._settled_at is None and previous_small is not None:
+                settled_streak = settled_streak + 1 if self._exposure_settled(previous_small, small) else 0
+                settled = settled_streak >= self.settled_checks
+            previous_small = small
+
+            with self._frame_cond:
+                self._ring_times[slot] = time.monotonic()
+                self._ring_motion[slot] = motion
+                self._frame_count += 1
+                if settled:
+                    self._settled_at = self._frame_count
+                self._frame_cond.notify_all()
+
+    def _motion_image(self, frame):
+        """動き検出用の縮小グレー画像"""
+        h, w = frame.shape[:2]
+        size = (self.motion_width, max(1, round(h * self.motion_width / w)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def _exposure_settled(self, previous_small, small):
+        """
+        1組のフレーム間で露出が変化していないか（十分に明るく、平均輝度とヒストグラムの
+        変化がともに閾値未満）。settled_checks 回連続で成立したら収束とみなす
+        """
+        if float(small.mean()) < self.min_warmup_brightness:
+            return False
+        luminance_change = abs(float(small.mean()) - float(previous_small.mean()))
+        if luminance_change >= self.luminance_threshold:
+            return False
+        hist = cv2.calcHist([small], [0], None, [32], [0, 256]).ravel()
+        previous_hist = cv2.calcHist([previous_small], [0], None, [32], [0, 256]).ravel()
+        histogram_change = 0.5 * float(np.abs(hist - previous_hist).sum()) / small.size
+        return histogram_change < self.histogram_threshold
+
+    def _warmup_end(self, warmup_frames):
+        """ウォームアップに使うフレーム数（適応時は露出が収束した時点、上限 warmup_frames）"""
+        if self.adaptive_warmup and self._settled_at is not None:
+            return min(self._settled_at, warmup_frames)
+        return warmup_frames
+
+    def _is_stable(self, latest, frames):
+        """latest から遡って frames フレームの動きが全て閾値未満か"""
+        if self._frame_count < frames:
+            return False
+        return all(self._ring_motion[(latest - i) % self.ring_size] < self.motion_threshold
+                   for i in range(frames))
+
+    def _snapshot(self, warmup_frames, capture_frames, reduce, timeout=2.0, stable_frames=0):
+        """
+        リングバッファの直近の安定フレームを reduce(frames) で1枚にする
+
+        起動直後は warmup_frames 枚を捨てた後のフレームが capture_frames 枚
+        たまるまで待つ（以降は待ち時間なし）。
+        stable_frames > 0 の場合は、さらに直近 stable_frames フレームが静止するまで
+        待つ（stability_timeout を超えたら待たずに撮影）。待ち時間は last_stability_wait に記録。
+
+        Returns:
+            numpy.ndarray: reduce の結果（取得できなければNone）
+        """
+        count = min(capture_frames, self.ring_size - 1)
+        stable_frames = min(stable_frames, self.ring_size - 1)
+        start = time.monotonic()
+        deadline = start + timeout
+        stable_deadline = start + self.stability_timeout
+        with self._frame_cond:
+            while True:
+                now = time.monotonic()
+                latest = self._frame_count - 1
+                warmup_end = self._warmup_end(warmup_frames)
+                ready = (self._frame_count >= warmup_end + count and
+                         now - self._ring_times[latest % self.ring_size] <= self.max_frame_age)
+                if ready:
+                    if not stable_frames or self._is_stable(latest, stable_frames):
+                        break
+                    if now >= stable_deadline:
+                        logger.warning(f"[[CAMERA]] 静止待ちタイムアウト ({self.stability_timeout}s)、最新フレームで撮影")
+                        break
+                    remaining = stable_deadline - now
+                else:
+                    remaining = deadline - now
+                if remaining <= 0 or not self._grabber_running:
+                    return None
+                self._frame_cond.wait(remaining)
+
+            if not self._warmup_logged and warmup_frames:
+                self._warmup_logged = True
+                logger.info(f"[[CAMERA]] ウォームアップ: {warmup_end}フレーム使用 (上限{warmup_frames})")
+
+            if stable_frames:
+                self.last_stability_wait = time.monotonic() - start
+                logger.info(f"[[CAMERA]] 静止待ち: {self.last_stability_wait * 1000:.0f}ms "
+                            f"(K={stable_frames}, 閾値={self.motion_threshold})")
+
+            # ロック中はカウンタが進まないため、書き込み中のスロットと重ならない。
+            # ロック中にコピーだけ行い、合成はロックを離してから行う（取得スレッドを止めない）
+            slots = [(latest - i) % self.ring_size for i in range(count)]
+            frames = [self._ring[slot].copy() for slot in slots]
+        return reduce(frames)
+
     
     def capture_with_stabilization(self, warmup_frames=5, capture_frames=5):
         """
@@ -304,18 +495,45 @@ class CameraCapture:
             if not self.initialize():
                 return None
         
+        if self._grabber_thread is not None:
+            # 静止待ち時は、静止を確認したフレームだけで合成する
+            stable_frames = self.stable_frames if self.stability_gate else 0
+            if stable_frames:
+                capture_frames = min(capture_frames, stable_frames)
+            self.last_stability_wait = None
+            frame = self._snapshot(warmup_frames, capture_frames, self.temporal_filter.apply,
+                                   stable_frames=stable_frames)
+            if frame is None:
+                logger.error("[[CAMERA]] リングバッファから安定フレームを取得できませんでした")
+                return None
+            logger.info(f"撮影完了: リングバッファの直近{min(capture_frames, self.ring_size - 1)}フレームから合成")
+            return frame
+
         logger.info(f"撮影開始: ウォームアップ{warmup_frames}フレーム, 撮影{capture_frames}フレーム")
         
         max_retries = 2
         for retry in range(max_retries + 1):
-            # 1. ウォームアップ（露出安定待ち）
+            # 1. ウォームアップ（露出安定待ち。適応時は収束したら打ち切り）
             warmup_success = 0
+            warmup_used = 0
+            previous_small = None
+            settled_streak = 0
             for i in range(warmup_frames):
-                ret, _ = self.cap.read()
-                if ret:
-                    warmup_success += 1
-                else:
+                ret, warmup_frame = self.cap.read()
+                warmup_used += 1
+                if not ret:
                     logger.warning(f"ウォームアップフレーム{i}の取得失敗")
+                    continue
+                warmup_success += 1
+                if self.adaptive_warmup:
+                    small = self._motion_image(warmup_frame)
+                    if previous_small is not None:
+                        settled_streak = settled_streak + 1 if self._exposure_settled(previous_small, small) else 0
+                        if settled_streak >= self.settled_checks:
+                            break
+                    previous_small = small
+            if self.adaptive_warmup:
+                logger.info(f"[[CAMERA]] ウォームアップ: {warmup_used}フレーム使用 (上限{warmup_frames})")
             
             # ウォームアップが全て失敗した場合はカメラを再初期化
             if warmup_success == 0 and retry < max_retries:
@@ -334,7 +552,7 @@ class CameraCapture:
             for i in range(capture_frames):
                 ret, frame = self.cap.read()
                 if ret:
-                    frames.append(frame.astype(np.float32))
+                    frames.append(frame)
                 else:
                     logger.warning(f"キャプチャフレーム{i}の取得失敗")
             
@@ -351,7 +569,7 @@ class CameraCapture:
         
         # 3. 中央値を計算（フリッカー除去）
         # 中央値は外れ値に強く、蛍光灯のフリッカーに効果的
-        median_frame = np.median(np.stack(frames), axis=0).astype(np.uint8)
+        median_frame = self.temporal_filter.apply(frames)
         
         logger.info(f"撮影完了: {len(frames)}フレームから合成")
         return median_frame
@@ -363,6 +581,9 @@ class CameraCapture:
         if not self._is_initialized:
             if not self.initialize():
                 return None
+
+        if self._grabber_thread is not None:
+            return self._snapshot(0, 1, lambda frames: frames[0].copy())
         
         ret, frame = self.cap.read()
         if ret:
@@ -371,6 +592,7 @@ class CameraCapture:
     
     def release(self):
         """カメラリソースを解放"""
+        self.stop_grabber()
         if self.cap is not None:
             self.cap.release()
             self._is_initialized = False
@@ -384,6 +606,85 @@ class CameraCapture:
         self.release()
 
 
+class CameraPool:
+    """
+    複数のカメラを開いたまま保持するプール
+
+    カメラごとに初期化（マニュアル設定・ウェイクアップ待機）を1回だけ行い、
+    撮影対象の切り替えはアクティブなカメラの参照を差し替えるだけにする。
+    常時取得モードでは待機中のカメラも取得を続けるため、切り替え直後から
+    露出の安定したフレームが使える。
+    """
+
+    def __init__(self, camera_kwargs=None, device_settings=None):
+        """
+        Args:
+            camera_kwargs: 全カメラ共通の CameraCapture 引数
+            device_settings: インデックスごとの上書き設定 {index: {"exposure": -20, ...}}
+        """
+        self.camera_kwargs = dict(camera_kwargs or {})
+        self.device_settings = dict(device_settings or {})
+        self._cameras = {}
+        self._lock = threading.Lock()
+        self.active = None
+
+    def add(self, camera):
+        """作成済みのカメラをプールに登録（同じインデックスがあれば置き換えない）"""
+        with self._lock:
+            existing = self._cameras.setdefault(camera.camera_index, camera)
+            if self.active is None:
+                self.active = existing
+            return existing
+
+    def get(self, index, initialize=True):
+        """
+        インデックスのカメラを取得（未登録なら device_settings を適用して作成）
+
+        Args:
+            initialize: Trueなら未初期化のカメラをここで初期化する
+                        （Falseなら最初の撮影・ウォームアップ時に初期化される）
+        """
+        with self._lock:
+            camera = self._cameras.get(index)
+        if camera is None:
+            kwargs = dict(self.camera_kwargs)
+            kwargs.update(self.device_settings.get(index, {}))
+            camera = self.add(CameraCapture(camera_index=index, auto_detect=False, **kwargs))
+        if initialize and not camera._is_initialized:
+            camera.initialize()
+        return camera
+
+    def preload(self, indices):
+        """指定したカメラを事前に開いて初期化する"""
+        ok = True
+        for index in indices:
+            ok = self.get(index)._is_initialized and ok
+        return ok
+
+    def activate(self, index):
+        """アクティブなカメラを切り替える（初回のみ初期化）"""
+        if self.active is not None and self.active.camera_index == index and self.active._is_initialized:
+            return self.active
+        camera = self.get(index)
+        previous = self.active.camera_index if self.active is not None else None
+        self.active = camera
+        logger.info(f"[[CAMERA]] アクティブカメラ切り替え: {previous} -> {index}")
+        return camera
+
+    def indices(self):
+        with self._lock:
+            return sorted(self._cameras)
+
+    def release(self):
+        """全カメラを解放"""
+        with self._lock:
+            cameras = list(self._cameras.values())
+            self._cameras.clear()
+            self.active = None
+        for camera in cameras:
+            camera.release()
+
+
 # モジュールテスト用
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -0,0 +1,296 @@
+"""
+camera_registry.py - カメラ検出結果のキャッシュと並列プローブ
+
+cv2.VideoCapture でインデックスを1つずつ開いてフレームを読む検出は数秒かかるため、
+候補を並列に（タイムアウト付きで）プローブし、結果をディスクにキャッシュする。
+
+キャッシュ (camera_cache.json):
+- インデックス・名前・解像度・FPS・フレーム取得可否
+- デバイス構成のフィンガープリント（macOS: system_profiler のカメラ一覧、
+  Linux: /dev/video* の一覧）。変化したら（= ホットプラグ）自動で再スキャン
+  （フィンガープリントを取れないOS（Windows等）ではホットプラグを検出できないため、
+  キャッシュを使わず毎回プローブする）
+- 明示的な再スキャン: CameraRegistry.rescan() / python list_cameras.py --rescan
+"""
+
+import glob
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CAMERA_CACHE_FILE = os.path.join(SCRIPT_DIR, "camera_cache.json")
+
+# 1台あたりのプローブ上限（秒）。超えたカメラは利用不可として扱う
+PROBE_TIMEOUT = 3.0
+
+
+def get_macos_cameras():
+    """
+    macOSでカメラデバイス名とインデックスのマッピングを取得
+    Returns: list of dict [{"index": int, "name": str, "unique_id": str}, ...]
+    """
+    if sys.platform != "darwin":
+        return []
+
+    try:
+        result = subprocess.run(
+            ["system_profiler", "SPCameraDataType", "-json"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        data = json.loads(result.stdout)
+        cameras = []
+
+        if "SPCameraDataType" in data:
+            for i, cam in enumerate(data["SPCameraDataType"]):
+                name = cam.get("_name", f"Camera {i}")
+                cameras.append({"index": i, "name": name, "unique_id": cam.get("spcamera_unique-id", "")})
+                logger.info(f"macOS カメラ検出: Index {i} = {name}")
+
+        return cameras
+    except Exception as e:
+        logger.warning(f"macOSカメラ情報の取得に失敗: {e}")
+        return []
+
+
+def device_fingerprint(macos_cameras=None):
+    """
+    接続デバイス構成の識別子（ホットプラグ検出用）
+
+    Returns:
+        list: デバイス識別子のリスト（取得手段がないOSではNone = キャッシュを使わない）
+    """
+    if sys.platform == "darwin":
+        if macos_cameras is None:
+            macos_cameras = get_macos_cameras()
+        return [f"{cam['name']}|{cam['unique_id']}" for cam in macos_cameras]
+    if sys.platform.startswith("linux"):
+        return sorted(glob.glob("/dev/video*"))
+    return None
+
+
+def probe_camera(index):
+    """
+    1台のカメラを開いて解像度・FPS・フレーム取得可否を調べる
+
+    Returns:
+        dict: プローブ結果（開けなければNone）
+    """
+    cap = cv2.VideoCapture(index)
+    try:
+        if not cap.isOpened():
+            return None
+        ret, _ = cap.read()
+        return {
+            "index": index,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": cap.get(cv2.CAP_PROP_FPS),
+            "frame_ok": bool(ret),
+        }
+    finally:
+        cap.release()
+
+
+def probe_cameras(indices, timeout=PROBE_TIMEOUT):
+    """
+    複数のインデックスを並列にプローブする
+
+    タイムアウトしたプローブはバックグラウンドで終了を待たずに打ち切る。
+
+    Returns:
+        tuple: ({index: プローブ結果 or None}, タイムアウトしたインデックスのリスト)
+    """
+    indices = list(indices)
+    if not indices:
+        return {}, []
+
+    executor = ThreadPoolExecutor(max_workers=len(indices), thread_name_prefix="camera-probe")
+    futures = {executor.submit(probe_camera, i): i for i in indices}
+    done, not_done = wait(futures, timeout=timeout)
+    executor.shutdown(wait=False)
+
+    results = {}
+    timed_out = []
+    for future, index in futures.items():
+        if future in not_done:
+            logger.warning(f"[[CAMERA]] Index {index}: プローブがタイムアウト ({timeout}s)")
+            results[index] = None
+            timed_out.append(index)
+            continue
+        try:
+            results[index] = future.result()
+        except Exception as e:
+            logger.warning(f"[[CAMERA]] Index {index}: プローブ失敗 - {e}")
+            results[index] = None
+    return results, timed_out
+
+
+class CameraRegistry:
+    """カメラ検出結果をディスクにキャッシュするレジストリ"""
+
+    def __init__(self, cache_path=CAMERA_CACHE_FILE, probe_timeout=PROBE_TIMEOUT):
+        """
+        Args:
+            cache_path: キャッシュファイルのパス
+            probe_timeout: 1回の並列プローブの上限（秒）
+        """
+        self.cache_path = cache_path
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._cache = None
+
+    def _load_cache(self):
+        if self._cache is None and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self._cache = json.load(f)
+            except Exception as e:
+                logger.warning(f"[[CAMERA]] キャッシュ読み込み失敗: {e}")
+        return self._cache
+
+    def _save_cache(self, cache):
+        self._cache = cache
+        try:
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"[[CAMERA]] キャッシュ保存失敗: {e}")
+
+    def invalidate(self):
+        """キャッシュを破棄（次回の get_cameras で再スキャン）"""
+        with self._lock:
+            self._cache = None
+            if os.path.exists(self.cache_path):
+                os.remove(self.cache_path)
+
+    def rescan(self, indices=None, skip_keywords=()):
+        """明示的に再スキャンする"""
+        return self.get_cameras(indices, rescan=True, skip_keywords=skip_keywords)
+
+    def get_cameras(self, indices=None, rescan=False, skip_keywords=()):
+        """
+        カメラ一覧を取得（キャッシュが有効ならプローブしない）
+
+        Args:
+            indices: プローブするインデックス（Noneで macOSの一覧 または 0-2）
+            rescan: Trueでキャッシュを無視して再スキャン
+            skip_keywords: macOSのデバイス名にこれらを含むカメラは開かない
+                           （"skipped": True として記録）
+
+        Returns:
+            list: [{"index", "name", "width", "height", "fps", "frame_ok"}, ...]
+        """
+        with self._lock:
+            macos_cameras = get_macos_cameras()
+            fingerprint = device_fingerprint(macos_cameras)
+            if indices is None:
+                indices = [cam["index"] for cam in macos_cameras] or list(range(3))
+
+            # フィンガープリントがなければ構成の変化を検出できないので毎回プローブする
+            cache = None if rescan or fingerprint is None else self._load_cache()
+            if cache is not None:
+                if cache.get("fingerprint") != fingerprint:
+                    logger.info("[[CAMERA]] デバイス構成が変化したため再スキャンします")
+                elif not set(indices) <= set(cache.get("probed", [])):
+                    logger.info("[[CAMERA]] 未プローブのインデックスがあるため再スキャンします")
+                else:
+                    logger.info(f"[[CAMERA]] キャッシュを使用 ({cache.get('scanned_at')})")
+                    requested = set(indices)
+                    return [cam for cam in cache["cameras"] if cam["index"] in requested]
+
+            names = {cam["index"]: cam["name"] for cam in macos_cameras}
+            skipped = [i for i in indices
+                       if i in names and any(kw in names[i].lower() for kw in skip_keywords)]
+            probe_indices = [i for i in indices if i not in skipped]
+            logger.info(f"[[CAMERA]] カメラを並列プローブ中: {probe_indices}")
+            probed, timed_out = probe_cameras(probe_indices, timeout=self.probe_timeout)
+            for index in skipped:
+                logger.info(f"[[CAMERA]] 仮想カメラはプローブしません: {names[index]} (Index {index})")
+                probed[index] = {"index": index, "width": 0, "height": 0, "fps": 0.0,
+                                 "frame_ok": False, "skipped": True}
+
+            cameras = []
+            for index in sorted(probed):
+                info = probed[index]
+                if info is None:
+                    continue
+                info["name"] = names.get(index, f"Unknown Camera {index}")
+                cameras.append(info)
+
+            self._save_cache({
+                "fingerprint": fingerprint,
+                "scanned_at": datetime.now().isoformat(timespec="seconds"),
+                # タイムアウトしたインデックス（開くのが遅いカメラ）は未プローブ扱いにして次回また調べる
+                "probed": sorted(set(indices) - set(timed_out)),
+                "cameras": cameras,
+            })
+            return cameras
+
+    def get(self, index):
+        """キャッシュ済みのカメラ情報（なければNone）"""
+        cache = self._load_cache()
+        if cache is None:
+            return None
+        return next((cam for cam in cache["cameras"] if cam["index"] == index), None)
+
+    def find_physical_index(self, exclude_keywords, rescan=False):
+        """
+        仮想カメラを除外して最高解像度の物理カメラのインデックスを返す
+
+        Returns:
+            int: 物理カメラのインデックス（見つからなければ1）
+        """
+        candidates = []
+        for cam in self.get_cameras(rescan=rescan, skip_keywords=exclude_keywords):
+            name = cam["name"]
+            if cam.get("skipped"):
+                continue
+            if not cam["frame_ok"]:
+                logger.info(f"[[CAMERA]] Index {cam['index']}: フレーム取得失敗、スキップ")
+                continue
+
+            # OBS仮想カメラの特徴:
+            # - FPSが0または非常に低い（30未満）場合がある
+            # - 名前に "OBS" や "Virtual" が含まれる
+            if cam["fps"] < 5 or any(kw in name.lower() for kw in exclude_keywords):
+                logger.info(f"[[CAMERA]] Index {cam['index']} は仮想カメラの可能性大（FPS={cam['fps']}, name={name}）、スキップ")
+                continue
+
+            logger.info(f"[[CAMERA]] 物理カメラ候補: Index {cam['index']} = {name} "
+                        f"({cam['width']}x{cam['height']} @ {cam['fps']:.1f}fps)")
+            candidates.append(cam)
+
+        if not candidates:
+            logger.warning("[[CAMERA]] 物理カメラが見つかりません。Index 1を試します。")
+            # OBS Virtual Cameraが Index 0 で、物理カメラが Index 1 の場合が多い
+            return 1
+
+        # 最高解像度のカメラを優先（物理カメラは通常高解像度）
+        best = max(candidates, key=lambda c: c["width"] * c["height"])
+        logger.info(f"[[CAMERA]] 選択: Index {best['index']} = {best['name']}")
+        return best["index"]
+
+
+_default_registry = None
+
+
+def default_registry():
+    """プロセス共通のレジストリ"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = CameraRegistry()
+    return _default_registry
@@ -0,0 +1,170 @@
+"""
+file_ingest.py - 監視フォルダに置かれた画像の取り込み
+
+watchdog のイベントスレッドでは待たずに、以下を別スレッドで行う。
+
+- 書き込み完了の検出: ファイルサイズと更新時刻が stable_seconds 秒以上
+  変化しなければ完了とみなす（close-write イベントが来れば即完了）。
+  遅いUSB/ネットワークコピーや、更新時刻の粒度が粗いファイルシステム (FAT, SMB) でも
+  書きかけを拾わないよう、回数ではなく経過時間で判定する
+- 完了とみなしたファイルは、開いて読めることを確認してからハッシュを取る（読めなければ待機を続ける）
+- 内容のハッシュ (SHA-1) で重複を除外（同じ画像の再コピー・イベント重複）
+  処理に成功した内容だけを記録するので、失敗したファイルは置き直せば再処理される。
+  記録は直近 max_digests 件まで（古いものから忘れる）
+- 完了したファイルはワーカープールで並列に処理
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """ファイル内容のSHA-1"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _readable(path):
+    """開いて先頭と末尾を読めるか（コピー元が排他的に開いている場合などは False）"""
+    try:
+        with open(path, 'rb') as f:
+            f.read(1)
+            f.seek(-1, os.SEEK_END)
+            return len(f.read(1)) == 1
+    except OSError:
+        return False
+
+
+class FileIngestor:
+    """書き込み完了を待ってからファイルをワーカープールで処理する"""
+
+    def __init__(self, handler, workers=2, poll_interval=0.1, stable_seconds=1.5, timeout=30.0,
+                 max_digests=1000):
+        """
+        Args:
+            handler: 完了したファイルのパスを受け取る関数 handler(path)（失敗時は例外を投げる）
+            workers: 並列に処理するワーカー数
+            poll_interval: サイズ・更新時刻を確認する間隔（秒）
+            stable_seconds: サイズ・更新時刻が何秒変化しなければ書き込み完了とみなすか
+            timeout: これを超えても完了しないファイルは諦める（秒）
+            max_digests: 重複判定のために覚えておく処理済みハッシュの数
+        """
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.stable_seconds = stable_seconds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._pending = {}
+        self.max_digests = max_digests
+        self._seen_digests = OrderedDict()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """書き込み完了の監視スレッドを開始"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch_loop, name="ingest-watch", daemon=True)
+        self._thread.start()
+
+    def watch(self, path):
+        """作成・移動されたファイルを監視対象に追加（即座に戻る）"""
+        with self._lock:
+            if path not in self._pending:
+                now = time.monotonic()
+                self._pending[path] = {"signature": None, "changed_at": now, "since": now, "closed": False}
+        self._wakeup.set()
+
+    def mark_closed(self, path):
+        """close-write イベント: 監視中なら書き込み完了として扱う"""
+        with self._lock:
+            entry = self._pending.get(path)
+            if entry is not None:
+                entry["closed"] = True
+        self._wakeup.set()
+
+    def _watch_loop(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+            with self._lock:
+                paths = list(self._pending.items())
+            ready = []
+            for path, entry in paths:
+                state = self._check(path, entry)
+                if state is None:
+                    continue
+                with self._lock:
+                    self._pending.pop(path, None)
+                if state:
+                    ready.append(path)
+
+            for path in ready:
+                self._executor.submit(self._process, path)
+
+    def _check(self, path, entry):
+        """
+        Returns:
+            True: 書き込み完了 / False: 破棄（消えた・タイムアウト） / None: 待機継続
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+
+        now = time.monotonic()
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if signature != entry["signature"]:
+            entry["signature"] = signature
+            entry["changed_at"] = now
+
+        unchanged = now - entry["changed_at"] >= self.stable_seconds
+        if stat.st_size > 0 and (entry["closed"] or unchanged) and _readable(path):
+            return True
+        if now - entry["since"] > self.timeout:
+            logger.warning(f"[[INGEST]] Gave up waiting for {os.path.basename(path)} ({self.timeout}s)")
+            return False
+        return None
+
+    def _process(self, path):
+        filename = os.path.basename(path)
+        try:
+            digest = file_digest(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if digest in self._seen_digests or digest in self._in_flight:
+                logger.info(f"[[INGEST]] Skipping duplicate content: {filename}")
+                return
+            self._in_flight.add(digest)
+
+        logger.info(f"[[INGEST]] Ready: {filename}")
+        try:
+            self.handler(path)
+        except Exception as e:
+            # 成功として記録しない（同じ内容を置き直せば再処理される）
+            logger.error(f"[[INGEST]] Handler failed for {filename}: {e}")
+            traceback.print_exc()
+            return
+        finally:
+            with self._lock:
+                self._in_flight.discard(digest)
+
+        with self._lock:
+            self._seen_digests[digest] = None
+            while len(self._seen_digests) > self.max_digests:
+                self._seen_digests.popitem(last=False)
@@ -0,0 +1,151 @@
+"""
+item_matcher.py - アイテム名の正規化マッチング（ローカル処理）
+
+Ollamaの分析結果のアイテム名を item_obsessions.CANONICAL_ITEMS の
+正規名に対応付ける。LLMを呼ばずに、以下の辞書から決定的に判定する。
+
+- MEMORY_DB のエイリアス（同じ本音指示を参照するキー = 同じ正規名）
+- 旧マッチングプロンプトにハードコードされていた対応表 (EXTRA_ALIASES)
+- NFKC正規化・小文字化・カタカナ→ひらがな変換・区切り記号の統一
+- 照合は alias_index.AliasIndex（Aho-Corasick、最長一致優先）
+
+正規名に書き換えるのは、名前全体がエイリアスに一致した場合（英語の複数形を含む）のみ。
+部分一致（"pen holder" の pen、ノートパソコン の ノート など）は複合語で別物を指すことが
+多いため採用せず、フォールバック（LLM、設定時）に回すか元の名前のまま返す。
+"""
+
+import logging
+
+import item_obsessions
+from alias_index import AliasIndex, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# 旧 OllamaClient.match_to_known_items のプロンプト内の対応表
+EXTRA_ALIASES = {
+    "cell phone": "smartphone",
+    "mobile": "smartphone",
+    "ballpoint pen": "pen",
+    "pencil": "pen",
+    "water bottle": "bottle",
+    "tumbler": "bottle",
+    "file": "notebook",
+    "document": "notebook",
+    "folder": "notebook",
+    "binder": "notebook",
+    "notepad": "notebook",
+    "sunglasses": "glasses",
+    "earbuds": "headphones",
+    "airpods": "headphones",
+}
+
+# 既知リストに対応しないことが分かっている名前（フォールバックも呼ばない）
+KNOWN_NON_ITEMS = {
+    "coffee mug",
+}
+
+
+class ItemMatcher:
+    """エイリアス辞書によるアイテム名→正規名のマッチング"""
+
+    def __init__(self, known_items=None, fallback=None):
+        """
+        Args:
+            known_items: 正規名リスト（デフォルト: item_obsessions.CANONICAL_ITEMS）
+            fallback: ローカルで判定できない場合に呼ぶ関数 fallback(name, known_items) -> str
+                      （例: OllamaClient.match_to_known_items）。Noneなら元の名前を返す
+        """
+        self.known_items = list(known_items or item_obsessions.CANONICAL_ITEMS)
+        self.fallback = fallback
+        self.index = AliasIndex(self._build_aliases())
+        self._non_items = {normalize_text(n) for n in KNOWN_NON_ITEMS}
+        logger.info(f"[[ITEM MATCH]] Local matcher ready: {len(self.index)} aliases -> {len(self.known_items)} items")
+
+    def _build_aliases(self) -> dict:
+        """エイリアス → 正規名 の辞書を作成（先に登録したものが優先）"""
+        aliases = {}
+
+        def add(alias, canonical):
+            aliases.setdefault(alias, canonical)
+
+        for canonical in self.known_items:
+            add(canonical, canonical)
+
+        # MEMORY_DB: 正規名と同じ本音指示を参照するキーは同じアイテム
+        for canonical in self.known_items:
+            instruction = item_obsessions.MEMORY_DB.get(canonical)
+            if instruction is None:
+                logger.warning(f"[[ITEM MATCH]] '{canonical}' is not a MEMORY_DB key, aliases not derived")
+                continue
+            for key, value in item_obsessions.MEMORY_DB.items():
+                if value is instruction:
+                    add(key, canonical)
+
+        for alias, canonical in EXTRA_ALIASES.items():
+            if canonical in self.known_items:
+                add(alias, canonical)
+
+        return aliases
+
+    def match_local(self, detected_name: str):
+        """
+        ローカル辞書のみでマッチングする（名前全体がエイリアスに一致する場合のみ）
+
+        Returns:
+            tuple: (canonical, alias) マッチしなければ (None, None)
+        """
+        match = self.index.lookup(detected_name)
+        if match is None:
+            return None, None
+        if match["method"] != "exact" and not self._is_plural_of(match["normalized"], match["alias"]):
+            # 複合語の一部だけの一致（"phone stand" -> phone など）は書き換えない
+            logger.info(f"[[ITEM MATCH]] '{detected_name}' only partially matches '{match['alias']}', not rewriting")
+            return None, None
+        return match["value"], match["alias"]
+
+    @staticmethod
+    def _is_plural_of(normalized, alias):
+        """名前全体が英語エイリアスの複数形か（"pens" / "watches"）"""
+        if not alias.isascii():
+            return False
+        return any(candidate in (alias + "s", alias + "es")
+                   for candidate in (normalized, normalized.replace(" ", "")))
+
+    def match(self, detected_name: str) -> str:
+        """
+        検出名を正規名に変換する（ローカル → フォールバック → 元の名前）
+        """
+        if not detected_name:
+            return detected_name
+
+        canonical, alias = self.match_local(detected_name)
+        if canonical is not None:
+            logger.info(f"[[ITEM MATCH]] '{detected_name}' -> '{canonical}' (local, alias='{alias}')")
+            return canonical
+
+        if normalize_text(detected_name) in self._non_items:
+            logger.info(f"[[ITEM MATCH]] '{detected_name}' -> No match in known list (local)")
+            return detected_name
+
+        if self.fallback is not None:
+            logger.info(f"[[ITEM MATCH]] '{detected_name}' not resolved locally, using fallback")
+            return self.fallback(detected_name, self.known_items)
+
+        logger.info(f"[[ITEM MATCH]] '{detected_name}' -> No match in known list (local)")
+        return detected_name
+
+
+# モジュールテスト用
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    import sys
+    import time
+
+    matcher = ItemMatcher()
+    names = sys.argv[1:] or ["ボールペン", "ｽﾏﾎ", "Water Bottle", "pencil case", "pens", "pen holder", "ノートパソコン"]
+    for n in names:
+        start = time.perf_counter()
+        result = matcher.match_local(n)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        print(f"{n!r:>20} -> {result} ({elapsed_us:.0f}us)")
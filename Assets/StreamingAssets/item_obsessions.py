@@ -2,6 +2,12 @@
 # Key: Keyword in item name (lowercase) - 複数キーワードで同じ内容を参照
 # Value: Witty inner thoughts instruction for generating cheeky dialogue
 
+import logging
+
+from alias_index import AliasIndex
+
+logger = logging.getLogger(__name__)
+
 # --- 共通の本音指示定義 ---
 
 _SMARTPHONE_WITTY = """
@@ -396,23 +402,33 @@ MEMORY_DB = {
 }
 
 
+# インポート時に1回だけ構築する照合インデックス（最長・最も具体的なキーワードを優先）
+_MEMORY_INDEX = AliasIndex(MEMORY_DB)
+
+
+def match_obsession(item_name: str) -> dict:
+    """
+    item_nameに一致するキーワードを照合し、診断情報を返す。
+
+    Returns:
+        dict: alias（一致したキーワード）, value（本音指示）, method, span,
+              candidates（一致した全キーワード）など。一致しなければNone
+    """
+    return _MEMORY_INDEX.lookup(item_name)
+
+
 def get_obsession_instruction(item_name: str) -> str:
     """
     Returns the witty instruction if the item name matches a keyword in the DB.
-    Now supports exact match first, then partial match.
+    Exact match first, then the longest (most specific) keyword contained in the name.
+    Full-width/half-width and katakana/hiragana variants are normalized.
     """
-    if not item_name:
+    match = match_obsession(item_name)
+    if match is None:
         return None
-        
-    name_lower = item_name.lower()
-    
-    # 1. 完全一致を優先
-    if name_lower in MEMORY_DB:
-        return MEMORY_DB[name_lower]
-    
-    # 2. 部分一致（キーワードがitem_nameに含まれるか）
-    for key, instruction in MEMORY_DB.items():
-        if key in name_lower:
-            return instruction
-            
-    return None
+
+    logger.info(
+        f"[[OBSESSION]] '{item_name}' -> '{match['alias']}' "
+        f"({match['method']}, candidates={match['candidates']})"
+    )
+    return match["value"]
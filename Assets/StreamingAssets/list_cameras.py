@@ -1,30 +1,25 @@
 """
 list_cameras.py - 接続されているカメラデバイスを一覧表示
+
+camera_registry のキャッシュを使用する（--rescan で強制再スキャン）。
 """
-import cv2
 import subprocess
 import sys
 
-def list_cameras_opencv():
-    """OpenCVで検出可能なカメラをリストアップ"""
+from camera_registry import CameraRegistry
+
+def list_cameras_opencv(rescan=False):
+    """OpenCVで検出可能なカメラをリストアップ（0-9 を並列プローブ、結果はキャッシュ）"""
     print("=== OpenCV カメラ検出 ===")
     available_cameras = []
     
-    for i in range(10):  # 0-9 までチェック
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            # カメラの情報を取得
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            
-            # テストフレームを取得
-            ret, frame = cap.read()
-            frame_ok = "OK" if ret and frame is not None else "NG"
-            
-            print(f"  Index {i}: {width}x{height} @ {fps}fps [Frame: {frame_ok}]")
-            available_cameras.append(i)
-            cap.release()
+    for cam in CameraRegistry().get_cameras(indices=range(10), rescan=rescan):
+        if cam.get("skipped"):
+            print(f"  Index {cam['index']}: {cam['name']} [仮想カメラ、未プローブ]")
+            continue
+        frame_ok = "OK" if cam["frame_ok"] else "NG"
+        print(f"  Index {cam['index']}: {cam['width']}x{cam['height']} @ {cam['fps']}fps [Frame: {frame_ok}]")
+        available_cameras.append(cam["index"])
     
     if not available_cameras:
         print("  検出されたカメラがありません")
@@ -47,7 +42,8 @@ def list_cameras_mac():
 if __name__ == "__main__":
     print("カメラデバイス検索中...\n")
     
-    cameras = list_cameras_opencv()
+    # python list_cameras.py --rescan でキャッシュを無視して再スキャン
+    cameras = list_cameras_opencv(rescan="--rescan" in sys.argv)
     
     if sys.platform == "darwin":  # macOS
         list_cameras_mac()
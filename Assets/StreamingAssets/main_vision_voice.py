@@ -6,6 +6,7 @@ import logging
 import threading
 import sys
 import cv2
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from datetime import datetime
 from watchdog.observers import Observer
@@ -15,11 +16,17 @@ from watchdog.events import FileSystemEventHandler
 from ollama_client import OllamaClient
 from deepseek_client import DeepSeekClient
 # from voice_client import VoiceClient  # TTS無効化
-from camera_capture import CameraCapture
-from yolo_processor import YOLOProcessor
-from rembg import remove
+from camera_capture import CameraPool, find_physical_camera_index
+from yolo_processor import YOLOProcessor, CascadeYOLOProcessor
+from background_remover import BackgroundRemover
 import item_obsessions
+from item_matcher import ItemMatcher
 from category_mapping import get_display_name
+from pipeline import Pipeline
+from archive_writer import ArchiveWriter
+from retention import RetentionManager
+from file_ingest import FileIngestor
+from stage_timing import VisitorTiming, TimingStats
 
 # --- Configuration & Constants ---
 WATCHED_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
@@ -28,6 +35,91 @@ CAPTURE_DIR = os.path.join(SCRIPT_DIR, "capture")
 VOICE_DIR = os.path.join(SCRIPT_DIR, "voice")
 CONFIG_FILE = os.path.join(SCRIPT_DIR, "config.json")
 MESSAGE_PAIRS_FILE = os.path.join(SCRIPT_DIR, "MessagePairs.json")
+TIMING_STATS_FILE = os.path.join(SCRIPT_DIR, "TimingStats.json")
+
+# パイプライン各ステージの入力キュー上限（満杯時は上流が待つ。トリガーは捨てない）
+PIPELINE_QUEUE_SIZE = 2
+# CAPTURE の投入を待つ上限（秒）。満杯のままならそのCAPTUREは受け付けない（stdinのQUITを読み続けるため）
+PIPELINE_SUBMIT_TIMEOUT = 0.5
+
+# Ollamaのビジョンモデルをメモリに保持する時間（-1で無期限。初回来場者の再ロード待ちを防ぐ）
+OLLAMA_KEEP_ALIVE = -1
+
+# Ollamaに送る画像の長辺上限（28px単位に揃える）と形式
+OLLAMA_IMAGE_MAX_SIDE = 672
+OLLAMA_IMAGE_FORMAT = "jpeg"
+
+# Ollama分析モード: "structured"（JSONスキーマ制約・JSON完結で打ち切り）/ "reasoning"（従来の段階的推論）
+OLLAMA_ANALYSIS_MODE = "structured"
+
+# アイテム名をローカル辞書で解決できない場合に、Ollamaでのマッチングにフォールバックするか
+ITEM_MATCH_LLM_FALLBACK = False
+
+# 背景除去マスクを推論する長辺サイズ（Noneで元解像度のまま推論）
+# 実際の展示画像で python background_remover.py <image> --compare 320 512 の比較結果を記録してから有効にする
+REMBG_MASK_LONG_SIDE = None
+
+# YOLOの検出ボックス（+マージン）の内側のみ背景除去の推論を行う
+REMBG_USE_YOLO_ROI = True
+REMBG_ROI_MARGIN_RATIO = 0.1
+
+# 正方形の台の誤検出として扱うクラス（ヒント・ROIから除外）
+SKIP_HINT_CLASSES = ["cell phone", "cellphone", "mobile phone", "smartphone"]
+
+# raw / 処理済み画像の書き込み待ちキュー上限（満杯時は上流が待つ）
+ARCHIVE_QUEUE_SIZE = 8
+
+# MessagePairs.json に残すペア数（これから外れた処理済み画像は retention で削除）
+MESSAGE_PAIRS_LIMIT = 100
+
+# capture/raw/ の保持ポリシー（retention.RetentionManager）
+RETENTION_RAW_KEEP_FULL = 20          # フル解像度のまま残す最新raw画像数
+RETENTION_RAW_LONG_SIDE = 1280        # それより古いrawを縮小する長辺（px）
+RETENTION_MAX_RAW_BYTES = 2 * 1024 ** 3
+RETENTION_MAX_AGE_DAYS = 14
+RETENTION_INTERVAL = 60.0             # 整理の実行間隔（秒）
+
+# フォルダに置かれた画像を並列に処理するワーカー数（書き込み完了を検出してから処理）
+INGEST_WORKERS = 2
+
+# YOLOの推論バックエンド（"torch" / "onnx" / "openvino"）
+# onnx / openvino は初回にカスタム語彙込みでエクスポートして yolo_exports/ にキャッシュする
+# 展示PCでの計測結果が yolo_processor.py に記録されるまでは従来の "torch" のまま
+YOLO_BACKEND = "torch"
+
+# YOLO検出前に長辺をこのサイズへ縮小する（Noneで元解像度のまま検出）
+# 320 / 480 / 640 の精度と速度は python yolo_processor.py <image> --sizes で比較できる
+# （計測結果が記録されるまでは従来どおり None）
+YOLO_DETECT_LONG_SIDE = None
+
+# 2段構成: nanoモデルを先に実行し、検出なし・低信頼度・SKIP_HINT_CLASSES の場合だけ YOLO-World を実行
+# 段ごとの確定回数は [[YOLO]] Cascade ログに出る（python yolo_processor.py <dir> --cascade でも集計可）
+YOLO_CASCADE = False
+YOLO_CASCADE_FAST_MODEL = "yolo11n.pt"
+YOLO_CASCADE_MIN_CONFIDENCE = 0.5
+
+# カメラを常時取得し、撮影要求時はリングバッファの直近フレームを即座に使う
+# 取得スレッドがカメラごとに常時デコード・縮小・動き計算を行うため、CPU負荷を実測するまで無効
+CAMERA_BACKGROUND_GRABBER = False
+CAMERA_RING_SIZE = 8
+# 常時取得時、CAPTURE を受けてから直近Kフレームの動きが閾値未満になるまで待って撮影する（ブレ対策）
+# 撮影のたびに待ち時間が加わるため既定は無効（自動撮影のトリガーではなく、手動撮影の静止待ち）
+CAMERA_STABILITY_GATE = False
+CAMERA_STABLE_FRAMES = 5
+CAMERA_MOTION_THRESHOLD = 2.0
+# 露出が収束したらウォームアップを打ち切る（ウォームアップフレーム数は上限として扱う）
+CAMERA_ADAPTIVE_WARMUP = True
+# キャプチャプロファイル（camera_capture.CAPTURE_PROFILES のキー。"max" = センサー最大解像度）
+CAMERA_PROFILE = "max"
+# 起動時に開いておく追加のカメラインデックス（CAPTURE <index> の切り替えを即時にする）
+CAMERA_POOL_PRELOAD = []
+# インデックスごとのカメラ設定の上書き（例: {1: {"exposure": -20}}）
+CAMERA_DEVICE_SETTINGS = {}
+# フリッカー除去のフレーム合成方法（"median" / より軽い "trimmed_mean"）
+CAMERA_TEMPORAL_FILTER = "median"
+
+# ステージ別レイテンシの p50/p95 を計算する直近の来場者数
+TIMING_STATS_WINDOW = 200
 
 # Ensure directories exist
 os.makedirs(CAPTURE_DIR, exist_ok=True)
@@ -60,19 +152,103 @@ PSYCHOLOGICAL_TRIGGERS = config_data.get("PSYCHOLOGICAL_TRIGGERS", [])
 
 # --- Initialize Clients ---
 try:
-    ollama_client = OllamaClient()
+    ollama_client = OllamaClient(
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        image_max_side=OLLAMA_IMAGE_MAX_SIDE,
+        image_format=OLLAMA_IMAGE_FORMAT,
+        analysis_mode=OLLAMA_ANALYSIS_MODE
+    )
     deepseek_client = DeepSeekClient()
     # voice_client = VoiceClient()  # TTS無効化
-    camera_capture = CameraCapture()
-    yolo_processor = YOLOProcessor()
+    camera_pool = CameraPool(
+        camera_kwargs={
+            "background_grabber": CAMERA_BACKGROUND_GRABBER,
+            "ring_size": CAMERA_RING_SIZE,
+            "temporal_filter": CAMERA_TEMPORAL_FILTER,
+            "profile": CAMERA_PROFILE,
+            "stability_gate": CAMERA_STABILITY_GATE,
+            "stable_frames": CAMERA_STABLE_FRAMES,
+            "motion_threshold": CAMERA_MOTION_THRESHOLD,
+            "adaptive_warmup": CAMERA_ADAPTIVE_WARMUP,
+        },
+        device_settings=CAMERA_DEVICE_SETTINGS
+    )
+    # 既定のカメラ（仮想カメラを除外して自動検出）。他のカメラと同じく CAMERA_DEVICE_SETTINGS を適用
+    camera_pool.get(find_physical_camera_index(), initialize=False)
+    if YOLO_CASCADE:
+        yolo_processor = CascadeYOLOProcessor(
+            fast_model_name=YOLO_CASCADE_FAST_MODEL,
+            min_confidence=YOLO_CASCADE_MIN_CONFIDENCE,
+            distrusted_classes=SKIP_HINT_CLASSES,
+            backend=YOLO_BACKEND,
+            detect_long_side=YOLO_DETECT_LONG_SIDE
+        )
+    else:
+        yolo_processor = YOLOProcessor(backend=YOLO_BACKEND, detect_long_side=YOLO_DETECT_LONG_SIDE)
+    background_remover = BackgroundRemover(
+        mask_long_side=REMBG_MASK_LONG_SIDE,
+        roi_margin_ratio=REMBG_ROI_MARGIN_RATIO
+    )
+    item_matcher = ItemMatcher(
+        item_obsessions.CANONICAL_ITEMS,
+        fallback=ollama_client.match_to_known_items if ITEM_MATCH_LLM_FALLBACK else None
+    )
+    archive_writer = ArchiveWriter(maxsize=ARCHIVE_QUEUE_SIZE)
+    retention_manager = RetentionManager(
+        CAPTURE_DIR,
+        RAW_CAPTURE_DIR,
+        MESSAGE_PAIRS_FILE,
+        raw_keep_full=RETENTION_RAW_KEEP_FULL,
+        raw_long_side=RETENTION_RAW_LONG_SIDE,
+        max_raw_bytes=RETENTION_MAX_RAW_BYTES,
+        max_age_days=RETENTION_MAX_AGE_DAYS,
+        interval=RETENTION_INTERVAL
+    )
+    timing_stats = TimingStats(TIMING_STATS_FILE, window=TIMING_STATS_WINDOW)
     logger.info("Clients initialized successfully (Hybrid Mode: YOLO + Ollama + DeepSeek + Camera, TTS disabled).")
 except Exception as e:
     logger.critical(f"Failed to initialize clients: {e}")
     exit(1)
 
-# --- Processing Lock (連打防止) ---
-processing_lock = threading.Lock()
-is_processing = False
+# --- Startup Warm-up ---
+def warmup_models():
+    """
+    YOLO・rembg・Ollamaを並列にロードし、それぞれダミー推論を1回実行する。
+    カメラ（既定 + CAMERA_POOL_PRELOAD）も開いて初期化しておく。
+    完了後に [[READY]] をUnityへ通知する。
+    """
+    logger.info("[[WARMUP]] Loading models in parallel (YOLO, rembg, Ollama)...")
+    start = time.monotonic()
+
+    targets = {
+        "yolo": yolo_processor.warmup,
+        "rembg": background_remover.warmup,
+        "ollama": ollama_client.warmup,
+    }
+    targets["camera"] = lambda: camera_pool.preload(
+        [camera_pool.active.camera_index] + CAMERA_POOL_PRELOAD
+    )
+
+    def run(name, func):
+        t0 = time.monotonic()
+        try:
+            ok = bool(func())
+        except Exception as e:
+            logger.error(f"[[WARMUP]] {name} failed: {e}")
+            ok = False
+        return ok, time.monotonic() - t0
+
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        futures = {name: executor.submit(run, name, func) for name, func in targets.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    for name, (ok, elapsed) in results.items():
+        logger.info(f"[[WARMUP]] {name}: {'OK' if ok else 'FAILED'} ({elapsed:.1f}s)")
+
+    status = " ".join(f"{name}={'ok' if ok else 'failed'}" for name, (ok, _) in results.items())
+    print(f"[[READY]] {status} ({time.monotonic() - start:.1f}s)")
+    sys.stdout.flush()
+
 
 # --- Logic Helper Functions ---
 # --- Logic Helper Functions ---
@@ -127,52 +303,59 @@ def get_voice_uuid(persona_id):
         return random.choice(variants) # Random variation within the persona category
     return None
 
+# MessagePairs.json の読み書きを直列化する（取り込みワーカーと persist ステージから呼ばれる）
+_message_pairs_lock = threading.Lock()
+
 def _save_message_pair(image_filename, message, credit):
     """
     画像とメッセージのペア情報をMessagePairs.jsonに保存する
     """
     try:
-        pairs = []
-        if os.path.exists(MESSAGE_PAIRS_FILE):
-            with open(MESSAGE_PAIRS_FILE, 'r', encoding='utf-8') as f:
-                pairs = json.load(f)
-        
-        pair_data = {
-            "image": image_filename,
-            "message": message,
-            "credit": credit,
-            "timestamp": datetime.now().isoformat()
-        }
-        pairs.append(pair_data)
-        
-        # 最新100件に制限
-        pairs = pairs[-100:]
-        
-        with open(MESSAGE_PAIRS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(pairs, f, ensure_ascii=False, indent=2)
+        with _message_pairs_lock:
+            pairs = []
+            if os.path.exists(MESSAGE_PAIRS_FILE):
+                with open(MESSAGE_PAIRS_FILE, 'r', encoding='utf-8') as f:
+                    pairs = json.load(f)
+            
+            pair_data = {
+                "image": image_filename,
+                "message": message,
+                "credit": credit,
+                "timestamp": datetime.now().isoformat()
+            }
+            pairs.append(pair_data)
+            
+            # 最新 MESSAGE_PAIRS_LIMIT 件に制限
+            pairs = pairs[-MESSAGE_PAIRS_LIMIT:]
+            
+            # 一時ファイルに書いてから置き換える（書き込み中に落ちても既存のファイルは壊れない）
+            tmp_path = MESSAGE_PAIRS_FILE + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(pairs, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, MESSAGE_PAIRS_FILE)
         
         logger.info(f"[[PAIR_SAVED]] {image_filename} -> {message[:30]}...")
     except Exception as e:
         logger.error(f"Failed to save message pair: {e}")
 
 def process_image(image_path):
+    """
+    監視フォルダの画像を処理する（FileIngestor のワーカーから呼ばれる）
+
+    失敗時は例外を投げる（FileIngestor がログを出し、処理済みとして記録しない）
+    """
     if os.path.basename(image_path).startswith('.'):
         return
 
-    try:
-        time.sleep(1.0)
-        filename = os.path.basename(image_path)
-        logger.info(f"[[STATE_START]] Processing {filename}")
-        
-        analysis_data = ollama_client.analyze_image(image_path)
-        logger.info(f"[[OLLAMA ANALYSIS]] Data: {json.dumps(analysis_data, ensure_ascii=False)}")
-        
-        _process_analysis(analysis_data, filename)
-
-    except Exception as e:
-        logger.error(f"Processing Failed: {e}")
-        import traceback
-        traceback.print_exc()
+    filename = os.path.basename(image_path)
+    logger.info(f"[[STATE_START]] Processing {filename}")
+    
+    analysis_data = ollama_client.analyze_image(image_path)
+    if analysis_data is None:
+        raise RuntimeError(f"Ollama analysis failed for {filename}")
+    logger.info(f"[[OLLAMA ANALYSIS]] Data: {json.dumps(analysis_data, ensure_ascii=False)}")
+    
+    _process_analysis(analysis_data, filename)
 
 
 def apply_intelligent_brightness(image):
@@ -205,113 +388,244 @@ def apply_intelligent_brightness(image):
     
     return corrected
 
-def process_frame(frame):
+def _roi_boxes_in_crop(detection_info):
     """
-    numpy arrayの画像フレームを直接処理する（カメラキャプチャ用）
-    YOLOでオブジェクト検出→クロップ→Ollama分析
+    YOLOの検出ボックスをクロップ画像の座標系に変換する（背景除去のROI用）
+    台の誤検出クラスは、他の検出がある場合は除外する
     """
-    global is_processing
-    
+    detections = detection_info.get("detections")
+    crop_box = detection_info.get("crop_box")
+    if not detections or not crop_box:
+        return None
+
+    trusted = ~detections.class_mask(SKIP_HINT_CLASSES)
+    boxes = detections.boxes(trusted if trusted.any() else None)
+
+    offset = np.array([crop_box["x1"], crop_box["y1"], crop_box["x1"], crop_box["y1"]])
+    return [tuple(box) for box in (boxes - offset).tolist()]
+
+
+# --- Pipeline Stages ---
+# 各ステージは job(dict) を受け取り、次ステージへ渡す job を返す（Noneで打ち切り）
+
+def stage_capture(job):
+    """
+    [capture] カメラ切り替え＆フリッカー対策付きキャプチャ
+    カメラはこのステージのスレッドからのみ操作する
+    """
+    timing = job["timing"]
+    target_index = job.get("camera_index")
+    # カメラ切り替え（プール内のカメラは開いたまま。初回のみ初期化）
+    if target_index is not None:
+        camera_capture = camera_pool.activate(target_index)
+    else:
+        camera_capture = camera_pool.active
+        if not camera_capture._is_initialized:
+            camera_capture.initialize()
+
+    logger.info("[[CAPTURE]] Starting stabilized capture...")
+    with timing.stage("capture"):
+        frame = camera_capture.capture_with_stabilization()
+    if camera_capture.last_stability_wait is not None:
+        timing.record("stability_wait", camera_capture.last_stability_wait)
     if frame is None:
-        logger.error("Empty frame received")
-        return
-    
-    try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        raw_filename = f"raw_{timestamp}.jpg"
-        processed_filename = f"camera_{timestamp}.png"  # PNGで保存（背景透過対応）
-        
-        logger.info(f"[[STATE_START]] Processing camera frame: {processed_filename}")
-        
-        # 1. 元画像をraw/に保存
-        raw_path = os.path.join(RAW_CAPTURE_DIR, raw_filename)
-        cv2.imwrite(raw_path, frame)
-        logger.info(f"[[CAPTURE]] Raw image saved: {raw_path}")
-        
-        # 2. YOLOで検出＆クロップ
+        logger.error("[[CAPTURE]] Failed to capture frame")
+        return None
+
+    # キャプチャ完了をUnityに通知（Scanning状態への遷移トリガー）
+    logger.info("[[CAPTURE_DONE]]")
+    job["frame"] = frame
+    return job
+
+
+def stage_detect(job):
+    """[detect] 元画像の保存とYOLOによる検出＆クロップ"""
+    frame = job["frame"]
+
+    # 同一秒内の連続キャプチャでもファイル名が衝突しないようミリ秒まで含める
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+    timing = job.setdefault("timing", VisitorTiming())
+    timing.visitor_id = timestamp
+    job["raw_filename"] = f"raw_{timestamp}.jpg"
+    job["processed_filename"] = f"camera_{timestamp}.png"  # PNGで保存（背景透過対応）
+
+    logger.info(f"[[STATE_START]] Processing camera frame: {job['processed_filename']}")
+
+    # 1. 元画像をraw/に保存（バックグラウンドで書き込み、YOLOと並行）
+    raw_path = os.path.join(RAW_CAPTURE_DIR, job["raw_filename"])
+    # 計測はキュー投入のみ（書き込みはバックグラウンド。処理済み画像の書き込み完了待ちは archive_wait）
+    with timing.stage("raw_enqueue"):
+        archive_writer.submit(raw_path, frame)
+    logger.info(f"[[CAPTURE]] Raw image queued: {raw_path}")
+
+    # 2. YOLOで検出＆クロップ
+    with timing.stage("yolo"):
         cropped_frame, detection_info = yolo_processor.detect_and_crop(frame)
-        logger.info(f"[[YOLO]] Detection: {detection_info.get('detection_count', 0)} objects, type: {detection_info.get('crop_type', 'none')}")
-        
-        # 2.5 YOLO検出完了をUnityに通知（Phase 2 ローテーション開始トリガー）
-        primary_class = detection_info.get("primary_class")
-        if primary_class:
-            print(f"[[ITEM_IDENTIFIED]] {primary_class}")
-            sys.stdout.flush()
-        
-        # 3. 明るさ調整（暗所対策）
-        logger.info("[[PREPROCESS]] Adjusting brightness...")
+    logger.info(f"[[YOLO]] Detection: {detection_info.get('detection_count', 0)} objects, type: {detection_info.get('crop_type', 'none')}")
+
+    # 2.5 YOLO検出完了をUnityに通知（Phase 2 ローテーション開始トリガー）
+    primary_class = detection_info.get("primary_class")
+    if primary_class:
+        print(f"[[ITEM_IDENTIFIED]] {primary_class}")
+        sys.stdout.flush()
+
+    job["cropped_frame"] = cropped_frame
+    job["detection_info"] = detection_info
+    # 以降のステージでは元フレームは不要（メモリ解放）
+    job["frame"] = None
+    return job
+
+
+def stage_preprocess(job):
+    """[preprocess] 明るさ調整 → CLAHE → 背景除去 → 保存、YOLOヒント生成"""
+    cropped_frame = job["cropped_frame"]
+    detection_info = job["detection_info"]
+    timing = job["timing"]
+
+    # 3. 明るさ調整（暗所対策）
+    logger.info("[[PREPROCESS]] Adjusting brightness...")
+    with timing.stage("brightness"):
         bright_frame = apply_intelligent_brightness(cropped_frame)
-        
-        # 4. CLAHE（コントラスト調整）を適用
-        logger.info("[[PREPROCESS]] Applying CLAHE...")
+
+    # 4. CLAHE（コントラスト調整）を適用
+    logger.info("[[PREPROCESS]] Applying CLAHE...")
+    with timing.stage("clahe"):
         lab = cv2.cvtColor(bright_frame, cv2.COLOR_BGR2LAB)
         l, a, b = cv2.split(lab)
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
         l = clahe.apply(l)
         lab = cv2.merge([l, a, b])
         clahe_frame = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-        
-        # 5. 背景除去 (rembg)
-        logger.info("[[PREPROCESS]] Applying background removal...")
-        try:
-            _, buffer = cv2.imencode('.png', clahe_frame)
-            removed_bg = remove(buffer.tobytes())
-            # バイト列からnumpy arrayに復元
-            final_frame = cv2.imdecode(np.frombuffer(removed_bg, np.uint8), cv2.IMREAD_UNCHANGED)
-            logger.info("[[PREPROCESS]] Background removal successful")
-        except Exception as e:
-            logger.warning(f"[[PREPROCESS]] Background removal failed: {e}, using CLAHE-only")
-            final_frame = clahe_frame
-        
-        # 6. 最終処理済み画像をcapture/に保存
-        processed_path = os.path.join(CAPTURE_DIR, processed_filename)
-        cv2.imwrite(processed_path, final_frame)
-        logger.info(f"[[CAPTURE]] Final processed image saved: {processed_path}")
-        
-        # 7. YOLOヒントを生成（cell phone検出時はスキップ）
-        # 注意: YOLOは正方形の台を「cell phone」と誤検出しやすいため、
-        #       cell phone検出時はヒントを渡さず、Ollamaに純粋に画像判断させる
-        yolo_hint = None
-        primary_class = detection_info.get("primary_class")
-        primary_confidence = detection_info.get("primary_confidence", 0.0)
-        detected_classes = detection_info.get("detected_classes", [])
-        
-        # cell phone / mobile phone をフィルタリング
-        SKIP_HINT_CLASSES = ["cell phone", "cellphone", "mobile phone", "smartphone"]
-        
-        if primary_class:
-            if primary_class.lower() in SKIP_HINT_CLASSES:
-                logger.info(f"[[YOLO HINT]] SKIPPED: '{primary_class}' detected - likely misidentification of the display stand")
-            elif len(detected_classes) > 1:
-                # 他の検出からもcell phoneを除外
-                other_classes = [c for c in detected_classes if c != primary_class and c.lower() not in SKIP_HINT_CLASSES]
-                if other_classes:
-                    yolo_hint = f"Primary: {primary_class} (confidence: {primary_confidence:.2f}), also detected: {', '.join(other_classes)}"
-                else:
-                    yolo_hint = f"{primary_class} (confidence: {primary_confidence:.2f})"
-                logger.info(f"[[YOLO HINT]] Generated: {yolo_hint}")
+
+    # 5. 背景除去 (rembg)
+    logger.info("[[PREPROCESS]] Applying background removal...")
+    try:
+        # 常駐セッションでnumpy arrayのまま処理（PNG往復なし）
+        roi_boxes = _roi_boxes_in_crop(detection_info) if REMBG_USE_YOLO_ROI else None
+        with timing.stage("rembg"):
+            final_frame = background_remover.remove(clahe_frame, roi_boxes=roi_boxes)
+        logger.info("[[PREPROCESS]] Background removal successful")
+    except Exception as e:
+        logger.warning(f"[[PREPROCESS]] Background removal failed: {e}, using CLAHE-only")
+        final_frame = clahe_frame
+
+    # 6. 最終処理済み画像をcapture/に保存
+    processed_path = os.path.join(CAPTURE_DIR, job["processed_filename"])
+    with timing.stage("processed_enqueue"):
+        job["processed_saved"] = archive_writer.submit(processed_path, final_frame)
+    logger.info(f"[[CAPTURE]] Final processed image queued: {processed_path}")
+
+    # 7. YOLOヒントを生成（cell phone検出時はスキップ）
+    # 注意: YOLOは正方形の台を「cell phone」と誤検出しやすいため、
+    #       cell phone検出時はヒントを渡さず、Ollamaに純粋に画像判断させる
+    yolo_hint = None
+    primary_class = detection_info.get("primary_class")
+    primary_confidence = detection_info.get("primary_confidence", 0.0)
+    detected_classes = detection_info.get("detected_classes", [])
+
+    # cell phone / mobile phone をフィルタリング（SKIP_HINT_CLASSES）
+    if primary_class:
+        if primary_class.lower() in SKIP_HINT_CLASSES:
+            logger.info(f"[[YOLO HINT]] SKIPPED: '{primary_class}' detected - likely misidentification of the display stand")
+        elif len(detected_classes) > 1:
+            # 他の検出からもcell phoneを除外
+            other_classes = [c for c in detected_classes if c != primary_class and c.lower() not in SKIP_HINT_CLASSES]
+            if other_classes:
+                yolo_hint = f"Primary: {primary_class} (confidence: {primary_confidence:.2f}), also detected: {', '.join(other_classes)}"
             else:
                 yolo_hint = f"{primary_class} (confidence: {primary_confidence:.2f})"
-                logger.info(f"[[YOLO HINT]] Generated: {yolo_hint}")
-        
-        # 8. Ollamaで分析（最終処理済み画像を使用、YOLOヒント付き）
-        analysis_data = ollama_client.analyze_image(processed_path, yolo_hint=yolo_hint)
-        logger.info(f"[[OLLAMA ANALYSIS]] Data: {json.dumps(analysis_data, ensure_ascii=False)}")
-        
-        _process_analysis(analysis_data, processed_filename)
-        
+            logger.info(f"[[YOLO HINT]] Generated: {yolo_hint}")
+        else:
+            yolo_hint = f"{primary_class} (confidence: {primary_confidence:.2f})"
+            logger.info(f"[[YOLO HINT]] Generated: {yolo_hint}")
+
+    job["cropped_frame"] = None
+    job["final_frame"] = final_frame
+    job["processed_path"] = processed_path
+    job["yolo_hint"] = yolo_hint
+    return job
+
+
+def stage_analyze(job):
+    """[analyze] Ollamaで分析（最終処理済み画像をメモリから直接送信、YOLOヒント付き）"""
+    analysis_data = ollama_client.analyze_image(
+        job["processed_path"],
+        yolo_hint=job["yolo_hint"],
+        image=job.pop("final_frame"),
+        timing=job["timing"]
+    )
+    logger.info(f"[[OLLAMA ANALYSIS]] Data: {json.dumps(analysis_data, ensure_ascii=False)}")
+    if not analysis_data:
+        logger.error("[[OLLAMA ANALYSIS]] No analysis result, aborting this visitor")
+        return None
+
+    job["analysis_data"] = analysis_data
+    return job
+
+
+def stage_generate(job):
+    """[generate] アイテム名正規化 → DeepSeekでセリフ生成"""
+    message = _generate_message(job["analysis_data"], timing=job["timing"])
+    if message is None:
+        return None
+    job["speech_text"], job["credit"] = message
+    return job
+
+
+def stage_persist(job):
+    """[persist] 画像とメッセージのペアを保存し、レイテンシのサマリーを出力"""
+    timing = job["timing"]
+
+    # Unityがペアの画像を読めるよう、処理済みPNGの書き込み完了を待つ
+    try:
+        with timing.stage("archive_wait"):
+            job["processed_saved"].result()
     except Exception as e:
-        logger.error(f"Frame Processing Failed: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
-        is_processing = False
+        logger.error(f"[[ARCHIVE]] Processed image was not saved, skipping message pair: {e}")
+        return None
+
+    with timing.stage("pair_save"):
+        _finish_message(job["processed_filename"], job["speech_text"], job["credit"])
+
+    timing.emit()
+    timing_stats.add(timing)
+    return None
+
+
+PIPELINE_STAGES = [
+    ("capture", stage_capture),
+    ("detect", stage_detect),
+    ("preprocess", stage_preprocess),
+    ("analyze", stage_analyze),
+    ("generate", stage_generate),
+    ("persist", stage_persist),
+]
+
+processing_pipeline = Pipeline(PIPELINE_STAGES, queue_size=PIPELINE_QUEUE_SIZE)
 
 
 def _process_analysis(analysis_data, filename):
     """
-    分析結果を処理してセリフ生成・音声合成を行う（共通処理）
+    分析結果を処理してセリフ生成・音声合成を行う（ファイル監視用の共通処理）
     """
+    message = _generate_message(analysis_data)
+    if message is not None:
+        _finish_message(filename, *message)
+
+
+def _generate_message(analysis_data, timing=None):
+    """
+    分析結果からセリフを生成する（generateステージ）
+
+    Args:
+        analysis_data: Ollamaの分析結果
+        timing: VisitorTiming（item_match / deepseek の所要時間を記録）
+
+    Returns:
+        tuple: (speech_text, credit_str)
+    """
+    if timing is None:
+        timing = VisitorTiming()
     persona_id, role_name = determine_persona(analysis_data)
     
     item_name_raw = analysis_data.get("item_name", "Object")
@@ -321,10 +635,8 @@ def _process_analysis(analysis_data, filename):
     
     # アイテム名を正規化（既知リストとのマッチング）- 具体名の場合のみ
     if display_name == item_name_raw:
-        item_name = ollama_client.match_to_known_items(
-            item_name_raw, 
-            item_obsessions.CANONICAL_ITEMS
-        )
+        with timing.stage("item_match"):
+            item_name = item_matcher.match(item_name_raw)
     else:
         # 抽象名が使われる場合はそのまま使用
         item_name = display_name
@@ -350,12 +662,13 @@ def _process_analysis(analysis_data, filename):
     #     logger.warning("[[CREDIT]] No voice settings found.")
     voice_settings = None  # TTS無効化のためNoneに設定
 
-    full_text = deepseek_client.generate_dialogue(
-        item_name,
-        context_str,
-        topic,
-        obsession_instruction
-    )
+    with timing.stage("deepseek"):
+        full_text = deepseek_client.generate_dialogue(
+            item_name,
+            context_str,
+            topic,
+            obsession_instruction
+        )
     
     logger.info(f"[[DEEPSEEK RAW]] {full_text}")
 
@@ -376,6 +689,13 @@ def _process_analysis(analysis_data, filename):
     character_name = role_suffix if match else role_name
     # TTS無効化: COEIROINKクレジットを表示しない
     credit_str = f"by {character_name}"
+    return speech_text, credit_str
+
+
+def _finish_message(filename, speech_text, credit_str):
+    """
+    画像とメッセージのペアを記録して完了を通知する（persistステージ）
+    """
     _save_message_pair(filename, speech_text, credit_str)
 
     if len(speech_text) < 2:
@@ -410,38 +730,46 @@ def _process_analysis(analysis_data, filename):
 
 # --- Watcher Class (既存のファイル監視も維持) ---
 class ImageHandler(FileSystemEventHandler):
-    def __init__(self):
-        self.last_processed = {}
+    """
+    capture/ に置かれた画像を FileIngestor に渡す
+    （書き込み完了の待機と処理は別スレッド。observerスレッドでは待たない）
+    """
 
-    def on_created(self, event):
-        if event.is_directory: return
-        filename = os.path.basename(event.src_path)
-        ext = os.path.splitext(filename)[1].lower()
-        
-        # camera_で始まるファイルは process_frame() で既に処理済みなので無視
+    def __init__(self, ingestor):
+        self.ingestor = ingestor
+
+    def _accept(self, path):
+        filename = os.path.basename(path)
+        if filename.startswith('.'):
+            return False
+        # camera_で始まるファイルはパイプラインで既に処理済みなので無視
         if filename.startswith('camera_'):
             logger.info(f"Skipping camera-captured file (already processed): {filename}")
-            return
-        
-        if ext in WATCHED_EXTENSIONS:
-            now = time.time()
-            if filename in self.last_processed:
-                if now - self.last_processed[filename] < 2.0:
-                    logger.info(f"Skipping duplicate event for {filename}")
-                    return
-            
-            self.last_processed[filename] = now
-            time.sleep(1.0) 
-            process_image(event.src_path)
+            return False
+        return os.path.splitext(filename)[1].lower() in WATCHED_EXTENSIONS
+
+    def on_created(self, event):
+        if not event.is_directory and self._accept(event.src_path):
+            self.ingestor.watch(event.src_path)
+
+    def on_moved(self, event):
+        # 一時ファイル名で書き込んでからリネームするアプリ向け
+        if not event.is_directory and self._accept(event.dest_path):
+            self.ingestor.watch(event.dest_path)
+
+    def on_closed(self, event):
+        # close-write（inotify対応環境のみ）: 書き込み完了を即座に通知
+        if not event.is_directory:
+            self.ingestor.mark_closed(event.src_path)
 
 # --- stdin Listener (Unity からのコマンド受信) ---
 def stdin_listener():
     """
     stdinからのコマンドを監視するスレッド
     Unity側から送られてくるコマンドを処理
+    CAPTUREはパイプラインに投入するだけなので、処理中でも受け付ける
+    （先頭キューが PIPELINE_SUBMIT_TIMEOUT 秒空かなければ断り、QUIT を読み続ける）
     """
-    global is_processing, camera_capture
-    
     logger.info("[[STDIN]] Listener started - waiting for commands...")
     
     for line in sys.stdin:
@@ -450,11 +778,6 @@ def stdin_listener():
         if cmd.startswith("CAPTURE"):
             logger.info("[[STDIN]] CAPTURE command received")
             
-            # 処理中なら無視
-            if is_processing:
-                logger.warning("[[STDIN]] Already processing, ignoring CAPTURE")
-                continue
-            
             # 引数解析 (CAPTURE <index>)
             target_index = None
             parts = cmd.split()
@@ -462,42 +785,13 @@ def stdin_listener():
                 target_index = int(parts[1])
                 logger.info(f"[[CAPTURE]] Targeted Camera Index: {target_index}")
             
-            with processing_lock:
-                is_processing = True
-            
-            try:
-                # カメラ初期化（インデックス指定があれば再初期化）
-                if target_index is not None:
-                    if camera_capture.camera_index != target_index:
-                        logger.info(f"[[CAPTURE]] Switching camera index: {camera_capture.camera_index} -> {target_index}")
-                        camera_capture.release()
-                        # Unity側で指定されたインデックスを使用（auto_detect無効）
-                        camera_capture = CameraCapture(camera_index=target_index, auto_detect=False)
-                
-                if not camera_capture._is_initialized:
-                    camera_capture.initialize()
-                
-                # フリッカー対策付きキャプチャ
-                logger.info("[[CAPTURE]] Starting stabilized capture...")
-                frame = camera_capture.capture_with_stabilization()
-                
-                if frame is not None:
-                    # キャプチャ完了をUnityに通知（Scanning状態への遷移トリガー）
-                    logger.info("[[CAPTURE_DONE]]")
-                    # 別スレッドで処理（stdinリスナーをブロックしない）
-                    process_thread = threading.Thread(
-                        target=process_frame, 
-                        args=(frame,),
-                        daemon=True
-                    )
-                    process_thread.start()
-                else:
-                    logger.error("[[CAPTURE]] Failed to capture frame")
-                    is_processing = False
-                    
-            except Exception as e:
-                logger.error(f"[[CAPTURE]] Error: {e}")
-                is_processing = False
+            depths = processing_pipeline.queue_depths()
+            depths["archive"] = archive_writer.qsize()
+            if any(depths.values()):
+                logger.info(f"[[PIPELINE]] Queued behind in-flight visitors: {depths}")
+            job = {"camera_index": target_index, "timing": VisitorTiming()}
+            if not processing_pipeline.submit(job, timeout=PIPELINE_SUBMIT_TIMEOUT):
+                logger.warning(f"[[PIPELINE]] Pipeline full, CAPTURE rejected: {depths}")
         
         elif cmd == "QUIT":
             logger.info("[[STDIN]] QUIT command received, shutting down...")
@@ -511,12 +805,23 @@ if __name__ == "__main__":
     logger.info("--- Hybrid AI Object Voice System (v9.0: Camera + Ollama + DeepSeek) ---")
     
     # ファイル監視（既存機能を維持）
-    event_handler = ImageHandler()
+    file_ingestor = FileIngestor(process_image, workers=INGEST_WORKERS)
+    file_ingestor.start()
+    event_handler = ImageHandler(file_ingestor)
     observer = Observer()
     observer.schedule(event_handler, CAPTURE_DIR, recursive=False)
     observer.start()
     logger.info(f"File watcher started on: {CAPTURE_DIR}")
     
+    # モデルの事前ロード＆ウォームアップ（初回来場者の待ち時間対策）
+    # 完了までstdinは読まないが、Unityからのコマンドはパイプにバッファされる
+    warmup_models()
+    
+    # 画像保存・整理スレッドとステージ分割パイプラインを開始
+    archive_writer.start()
+    retention_manager.start()
+    processing_pipeline.start()
+    
     # stdin リスナーを別スレッドで開始
     stdin_thread = threading.Thread(target=stdin_listener, daemon=True)
     stdin_thread.start()
@@ -529,7 +834,9 @@ if __name__ == "__main__":
         logger.info("Keyboard interrupt received")
     finally:
         observer.stop()
-        camera_capture.release()
+        camera_pool.release()
+        # 書き込み待ちの画像を保存してから終了
+        archive_writer.flush(timeout=10.0)
         logger.info("Cleanup complete")
     
     observer.join()
@@ -1,17 +1,164 @@
 import ollama
+import cv2
+import numpy as np
 import json
 import re
 import logging
 import base64
 import os
+import time
 import prompts
 
 # Configure basic logging
 logger = logging.getLogger(__name__)
 
+# Qwen2.5-VL: 14px パッチ × 2x2 マージ = 28px 単位で1ビジョントークン
+VISION_PATCH_SIZE = 28
+
+
+def prepare_vision_image(image: np.ndarray, max_side: int = 672, patch_size: int = VISION_PATCH_SIZE,
+                         image_format: str = "jpeg", quality: int = 85,
+                         background_color=(255, 255, 255)) -> bytes:
+    """
+    ビジョンモデル送信用に画像を縮小・エンコードする（メモリ上で完結）
+
+    1. 長辺を max_side 以下に縮小し、幅・高さをパッチサイズの倍数に揃える
+    2. アルファチャンネル（rembgの透過部分）を単色背景に合成
+    3. JPEG / WebP にエンコード
+
+    Args:
+        image: BGR / BGRA / グレースケールの numpy array
+        max_side: 長辺の上限 (px)
+        patch_size: 幅・高さを揃える単位 (px)
+        image_format: "jpeg" または "webp"
+        quality: エンコード品質 (1-100)
+        background_color: 透過部分に合成する背景色 (BGR)
+
+    Returns:
+        bytes: エンコード済み画像
+    """
+    h, w = image.shape[:2]
+    scale = min(1.0, max_side / max(h, w))
+    new_w = max(patch_size, int(w * scale) // patch_size * patch_size)
+    new_h = max(patch_size, int(h * scale) // patch_size * patch_size)
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    elif image.shape[2] == 4:
+        # 縮小後に合成（フル解像度での浮動小数演算を避ける）
+        alpha = image[:, :, 3:4].astype(np.float32) / 255.0
+        background = np.array(background_color, dtype=np.float32)
+        image = (image[:, :, :3] * alpha + background * (1.0 - alpha)).astype(np.uint8)
+
+    if image_format == "webp":
+        ok, buffer = cv2.imencode('.webp', image, [cv2.IMWRITE_WEBP_QUALITY, quality])
+    else:
+        ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError(f"Failed to encode image as {image_format}")
+    return buffer.tobytes()
+
+
+class JsonObjectScanner:
+    """
+    ストリーミング出力を逐次読み込み、最初のトップレベルJSONオブジェクトが
+    閉じた時点でその文字列を返す（文字列リテラル・エスケープを考慮）
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+
+    def feed(self, text: str):
+        """
+        Returns:
+            str: 完結したJSONオブジェクト文字列（未完結ならNone）
+        """
+        for ch in text:
+            if not self.started:
+                if ch != '{':
+                    continue
+                self.started = True
+
+            self.buffer.append(ch)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '{':
+                self.depth += 1
+            elif ch == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    return "".join(self.buffer)
+        return None
+
+
 class OllamaClient:
-    def __init__(self, model_name="qwen2.5vl:7b"):
+    def __init__(self, model_name="qwen2.5vl:7b", keep_alive=None,
+                 image_max_side=672, image_format="jpeg", image_quality=85,
+                 analysis_mode="reasoning"):
+        """
+        Args:
+            model_name: Ollamaのビジョンモデル名
+            analysis_mode: "reasoning"（観察・推論の文章 + JSON）または
+                           "structured"（JSONスキーマ制約で出力し、JSONが閉じた時点で打ち切り）
+            keep_alive: モデルをメモリに保持する時間（例: "30m"、-1で無期限、Noneでサーバー既定）
+            image_max_side: 送信画像の長辺上限 (px, 28の倍数に揃えられる)
+            image_format: 送信画像の形式 ("jpeg" / "webp")
+            image_quality: 送信画像のエンコード品質
+        """
         self.model_name = model_name
+        self.keep_alive = keep_alive
+        self.image_max_side = image_max_side
+        self.image_format = image_format
+        self.image_quality = image_quality
+        self.analysis_mode = analysis_mode
+
+    def encode_image(self, image: np.ndarray) -> str:
+        """送信用に縮小・エンコードした画像をbase64文字列で返す"""
+        encoded = prepare_vision_image(
+            image,
+            max_side=self.image_max_side,
+            image_format=self.image_format,
+            quality=self.image_quality
+        )
+        logger.info(f"[[OLLAMA]] Image prepared: {self.image_format}, {len(encoded) / 1024:.0f}KB")
+        return base64.b64encode(encoded).decode("utf-8")
+
+    def warmup(self) -> bool:
+        """
+        モデルをメモリにロードし、小さな画像で1トークンだけ推論する。
+        keep_alive を指定してモデルを常駐させる。
+        """
+        logger.info(f"[Ollama] Warming up model: {self.model_name} (keep_alive={self.keep_alive})")
+        try:
+            dummy = np.full((VISION_PATCH_SIZE * 2, VISION_PATCH_SIZE * 2, 3), 255, dtype=np.uint8)
+            ollama.chat(
+                model=self.model_name,
+                messages=[{
+                    "role": "user",
+                    "content": "Describe this image in one word.",
+                    "images": [base64.b64encode(prepare_vision_image(dummy)).decode("utf-8")]
+                }],
+                options={"temperature": 0, "num_predict": 1},
+                keep_alive=self.keep_alive
+            )
+            logger.info("[Ollama] Warm-up complete")
+            return True
+        except Exception as e:
+            logger.error(f"[Ollama] Warm-up failed: {e}")
+            return False
 
     def extract_json(self, text):
         """
@@ -121,7 +268,8 @@ Example:
                 options={
                     "temperature": 0,
                     "num_predict": 50
-                }
+                },
+                keep_alive=self.keep_alive
             )
             result = response['message']['content'].strip().lower()
             
@@ -145,37 +293,62 @@ Example:
             logger.error(f"[[ITEM MATCH]] Error: {e}, keeping original: '{detected_name}'")
             return detected_name
 
-    def analyze_image(self, image_path: str, yolo_hint: str = None) -> dict:
+    def analyze_image(self, image_path: str = None, yolo_hint: str = None, image: np.ndarray = None,
+                      timing=None) -> dict:
         """
         Analyzes the image using local Ollama (Vision Model).
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file (used for loading when image is None, and for logging)
             yolo_hint: Optional hint from YOLO detection (e.g., "cell phone (confidence: 0.89)")
                        If provided, uses ANALYSIS_PROMPT_WITH_HINT template
+            image: Already preprocessed BGR/BGRA frame. Sent directly without re-reading the file.
+            timing: Optional stage_timing.VisitorTiming. Records "ollama_ttft" (time to first token)
+                    and "ollama_total" (encode + request + streaming).
         
         Note: Image preprocessing (CLAHE, background removal) is now done
-              in main_vision_voice.py before saving to capture/
+              in main_vision_voice.py before saving to capture/.
+              The image is downscaled and encoded to JPEG/WebP in memory before sending.
         """
-        if not os.path.exists(image_path):
-            logger.error(f"Image not found: {image_path}")
-            return None
+        if image is None:
+            if not image_path or not os.path.exists(image_path):
+                logger.error(f"Image not found: {image_path}")
+                return None
+            image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+            if image is None:
+                logger.error(f"Failed to read image: {image_path}")
+                return None
 
-        logger.info(f"Analyzing image (Local Ollama): {os.path.basename(image_path)}")
+        image_label = os.path.basename(image_path) if image_path else "(in-memory frame)"
+        logger.info(f"Analyzing image (Local Ollama): {image_label}")
         if yolo_hint:
             logger.info(f"[[YOLO HINT]] Using detection hint: {yolo_hint}")
 
+        request_start = time.monotonic()
         try:
-            # 画像をそのまま読み込み（前処理済み）
-            with open(image_path, "rb") as f:
-                image_data = base64.b64encode(f.read()).decode("utf-8")
+            # 縮小＋JPEG/WebP化した画像を送信（ビジョントークン数を削減）
+            image_data = self.encode_image(image)
+
+            structured = self.analysis_mode == "structured"
 
             # ヒントがある場合はヒント付きプロンプトを使用
-            if yolo_hint:
+            if structured:
+                if yolo_hint:
+                    prompt_text = prompts.ANALYSIS_PROMPT_STRUCTURED_WITH_HINT.format(yolo_hint=yolo_hint)
+                else:
+                    prompt_text = prompts.ANALYSIS_PROMPT_STRUCTURED
+            elif yolo_hint:
                 prompt_text = prompts.ANALYSIS_PROMPT_WITH_HINT.format(yolo_hint=yolo_hint)
             else:
                 prompt_text = prompts.ANALYSIS_PROMPT
 
+            # 構造化モード: JSONスキーマで出力を制約し、生成トークン上限も小さくする
+            request_kwargs = {}
+            if structured:
+                request_kwargs["format"] = prompts.ANALYSIS_SCHEMA
+            scanner = JsonObjectScanner() if structured else None
+            analysis_data = None
+
             # ストリーミングで進捗を通知
             full_content = ""
             token_count = 0
@@ -195,14 +368,19 @@ Example:
                 }],
                 options={
                     "temperature": 0.1,
-                    "num_predict": 1024,
+                    "num_predict": 256 if structured else 1024,
                     "top_p": 0.85,
                     "repeat_penalty": 1.1
                 },
-                stream=True
+                keep_alive=self.keep_alive,
+                stream=True,
+                **request_kwargs
             ):
                 if 'message' in chunk and 'content' in chunk['message']:
-                    full_content += chunk['message']['content']
+                    piece = chunk['message']['content']
+                    if token_count == 0 and timing is not None:
+                        timing.record("ollama_ttft", time.monotonic() - request_start)
+                    full_content += piece
                     token_count += 1
                     
                     # 一定トークンごとに進捗通知
@@ -210,9 +388,25 @@ Example:
                         print(f"[[OLLAMA_PROGRESS]] {token_count}")
                         import sys
                         sys.stdout.flush()
+
+                    # 構造化モード: JSONオブジェクトが閉じたらストリームを打ち切る
+                    if scanner is not None:
+                        json_text = scanner.feed(piece)
+                        if json_text is not None:
+                            try:
+                                analysis_data = json.loads(json_text)
+                                logger.info(f"[[OLLAMA]] JSON complete after {token_count} tokens, stopping stream")
+                                break
+                            except json.JSONDecodeError as e:
+                                logger.warning(f"[[OLLAMA]] Streamed JSON parse error: {e}")
+                                scanner = None
             
+            if timing is not None:
+                timing.record("ollama_total", time.monotonic() - request_start)
+
             content = full_content
-            analysis_data = self.extract_json(content)
+            if analysis_data is None:
+                analysis_data = self.extract_json(content)
             
             if not analysis_data:
                 logger.warning("Local Analysis JSON parsing failed. Using default.")
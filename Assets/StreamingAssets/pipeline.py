@@ -0,0 +1,110 @@
+"""
+pipeline.py - ステージ分割された処理パイプライン
+
+capture → detect → preprocess → analyze → generate → persist のように、
+処理をステージに分割し、ステージ間を上限付きキューで接続する。
+各ステージは専用スレッドで動くため、来場者N+1のYOLO/rembgを
+来場者NのDeepSeek待ちと並行して実行できる。
+
+- ステージ間はキューが満杯の場合に上流がブロックする（途中のジョブを捨てない）
+- 先頭への投入は timeout を指定でき、満杯のままなら投入を断る（stdin を止めないため）
+- ハンドラーがNoneを返したジョブはそこで終了
+- ハンドラー内の例外はログに出してそのジョブのみ破棄
+- ワーカーはデーモンスレッド（プロセス終了時に処理中のジョブは破棄される）
+"""
+
+import logging
+import queue
+import threading
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineStage:
+    """1つの処理ステージ（上限付き入力キュー + ワーカースレッド）"""
+
+    def __init__(self, name, handler, maxsize=2):
+        """
+        Args:
+            name: ステージ名（ログ用）
+            handler: job を受け取り、次ステージへ渡す job（またはNone）を返す関数
+            maxsize: 入力キューの上限
+        """
+        self.name = name
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.next_stage = None
+        self._thread = None
+
+    def start(self):
+        """ワーカースレッドを開始"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"pipeline-{self.name}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, job, timeout=None):
+        """
+        ジョブを投入（キューが満杯なら空くまで待つ）
+
+        Args:
+            timeout: 待つ上限（秒）。Noneなら空くまで待つ
+
+        Returns:
+            bool: 投入できたか（timeout 内に空かなければFalse）
+        """
+        if self.queue.full():
+            logger.warning(f"[[PIPELINE]] Stage '{self.name}' queue full, waiting...")
+        try:
+            self.queue.put(job, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                logger.error(f"[[PIPELINE]] Stage '{self.name}' failed: {e}")
+                traceback.print_exc()
+                result = None
+
+            if result is not None and self.next_stage is not None:
+                self.next_stage.submit(result)
+
+
+class Pipeline:
+    """PipelineStage を直列に接続したパイプライン"""
+
+    def __init__(self, stages, queue_size=2):
+        """
+        Args:
+            stages: [(name, handler), ...] の順序付きリスト
+            queue_size: 各ステージの入力キュー上限
+        """
+        self.stages = [PipelineStage(name, handler, maxsize=queue_size) for name, handler in stages]
+        for current, following in zip(self.stages, self.stages[1:]):
+            current.next_stage = following
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        logger.info(f"[[PIPELINE]] Started: {' -> '.join(s.name for s in self.stages)}")
+
+    def submit(self, job, timeout=None):
+        """先頭ステージにジョブを投入（timeout 内に空かなければFalse）"""
+        return self.stages[0].submit(job, timeout=timeout)
+
+    def queue_depths(self):
+        """各ステージの待ちジョブ数"""
+        return {stage.name: stage.qsize() for stage in self.stages}
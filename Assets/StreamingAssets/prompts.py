@@ -78,6 +78,59 @@ Output ONLY the following JSON. No additional text before or after:
 - item_category: "machine" | "cloth" | "container" | "stationery" | "leather" | "metal" | "other"
 """
 
+# 構造化出力モード用スキーマ（Ollama の format パラメータに渡す）
+# ANALYSIS_PROMPT の JSON Schema 節と同じ内容
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_machine": {"type": "boolean"},
+        "shape": {"type": "string", "enum": ["Round", "Sharp", "Square", "Other"]},
+        "state": {"type": "string", "enum": ["Old", "New", "Dirty", "Broken", "Normal"]},
+        "item_name": {"type": "string"},
+        "item_category": {
+            "type": "string",
+            "enum": ["machine", "cloth", "container", "stationery", "leather", "metal", "other"]
+        }
+    },
+    "required": ["is_machine", "shape", "state", "item_name", "item_category"]
+}
+
+# 構造化出力モード用プロンプト（観察・推論の文章は出力させず、JSONのみ）
+ANALYSIS_PROMPT_STRUCTURED = """
+You are an expert object analyst. Look carefully at the colors, materials, shape, surface condition and any visible text, then answer with JSON only.
+
+**CONTEXT:**
+The image shows an object placed on a SQUARE DISPLAY STAND/PLATFORM.
+- You must IGNORE the square stand and focus ONLY on the object placed ON TOP of it.
+- Do not identify the stand as the object (e.g., do not call it a phone just because the stand is rectangular).
+
+**JSON Schema (strictly follow):**
+- is_machine: boolean (true for electronic/mechanical devices)
+- shape: "Round" | "Sharp" | "Square" | "Other"
+- state: "Old" | "New" | "Dirty" | "Broken" | "Normal"
+- item_name: string (specific object name, Japanese preferred e.g. "ボールペン", "ノート", "時計")
+- item_category: "machine" | "cloth" | "container" | "stationery" | "leather" | "metal" | "other"
+"""
+
+ANALYSIS_PROMPT_STRUCTURED_WITH_HINT = """
+You are an expert object analyst. Look carefully at the colors, materials, shape, surface condition and any visible text, then answer with JSON only.
+
+**DETECTION HINT:** "{yolo_hint}"
+This hint comes from an automated detection system. Use it as a starting point, but verify through careful observation. The hint may be inaccurate.
+
+**CONTEXT:**
+The object is placed on a SQUARE DISPLAY STAND/PLATFORM.
+- You must IGNORE the stand and focus ONLY on the object placed ON TOP of it.
+- If the hint says "cell phone" or "smartphone", it is likely MISIDENTIFYING the square stand. Be extremely skeptical of this hint.
+
+**JSON Schema (strictly follow):**
+- is_machine: boolean (true for electronic/mechanical devices)
+- shape: "Round" | "Sharp" | "Square" | "Other"
+- state: "Old" | "New" | "Dirty" | "Broken" | "Normal"
+- item_name: string (specific object name, Japanese preferred e.g. "ボールペン", "ノート", "時計")
+- item_category: "machine" | "cloth" | "container" | "stationery" | "leather" | "metal" | "other"
+"""
+
 # Random Topics List - Memory & Episode Based (Universal for any object)
 TOPIC_LIST = [
     # Usage memories
@@ -0,0 +1,208 @@
+"""
+retention.py - capture/ と capture/raw/ の保持・圧縮ポリシー
+
+長期間の展示で画像が溜まり続けないよう、バックグラウンドで少しずつ整理する。
+
+- 処理済み画像 (capture/camera_*.png):
+  MessagePairs.json から参照されていないものを削除（処理中のものは猶予時間で保護）
+- raw画像 (capture/raw/raw_*.jpg):
+  - 直近 raw_keep_full 枚はそのまま
+  - それより古いものは長辺 raw_long_side px に縮小・再圧縮（ファイル名末尾 _s）
+  - max_age_days を超えたもの、合計サイズが max_raw_bytes を超えた分は古い順に削除
+- 1回のパスで処理する件数は batch_size まで（推論と競合しないよう少しずつ）
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# 縮小済みraw画像のファイル名末尾
+COMPACTED_SUFFIX = "_s.jpg"
+
+
+class RetentionManager:
+    """キャプチャ画像の保持・圧縮・削除をバックグラウンドで行う"""
+
+    def __init__(self, capture_dir, raw_dir, pairs_file, raw_keep_full=20, raw_long_side=1280,
+                 raw_quality=80, max_raw_bytes=2 * 1024 ** 3, max_age_days=14,
+                 grace_seconds=600, batch_size=20, interval=60.0):
+        """
+        Args:
+            capture_dir: 処理済み画像のディレクトリ (capture/)
+            raw_dir: raw画像のディレクトリ (capture/raw/)
+            pairs_file: MessagePairs.json のパス（参照中の処理済み画像の判定に使用）
+            raw_keep_full: フル解像度のまま残す最新のraw画像数
+            raw_long_side: 古いraw画像を縮小する長辺サイズ（px）
+            raw_quality: 縮小時のJPEG品質
+            max_raw_bytes: raw画像の合計サイズ上限（超えた分は古い順に削除）
+            max_age_days: raw画像の保持日数（Noneで無制限）
+            grace_seconds: これより新しい処理済み画像は削除しない（パイプライン処理中の保護）
+            batch_size: 1回のパスで縮小・削除するファイル数の上限
+            interval: バックグラウンド実行の間隔（秒）
+        """
+        self.capture_dir = capture_dir
+        self.raw_dir = raw_dir
+        self.pairs_file = pairs_file
+        self.raw_keep_full = raw_keep_full
+        self.raw_long_side = raw_long_side
+        self.raw_quality = raw_quality
+        self.max_raw_bytes = max_raw_bytes
+        self.max_age_days = max_age_days
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.interval = interval
+        self._thread = None
+
+    def start(self):
+        """バックグラウンドスレッドを開始"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+        self._thread.start()
+        logger.info(f"[[RETENTION]] Started (interval={self.interval}s, batch={self.batch_size})")
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"[[RETENTION]] Pass failed: {e}")
+            time.sleep(self.interval)
+
+    def run_once(self):
+        """
+        1回分の整理を行う（最大 batch_size 件）
+
+        Returns:
+            dict: {"deleted_processed", "compacted_raw", "deleted_raw"}
+        """
+        budget = self.batch_size
+        deleted_processed = self._prune_processed(budget)
+        budget -= deleted_processed
+        deleted_raw = self._enforce_raw_budget(budget)
+        budget -= deleted_raw
+        compacted_raw = self._compact_raws(budget)
+
+        result = {"deleted_processed": deleted_processed, "compacted_raw": compacted_raw, "deleted_raw": deleted_raw}
+        if any(result.values()):
+            logger.info(f"[[RETENTION]] {result}")
+        return result
+
+    def _referenced_images(self):
+        """MessagePairs.json から参照されている画像名（読めなければNone）"""
+        if not os.path.exists(self.pairs_file):
+            return set()
+        try:
+            with open(self.pairs_file, 'r', encoding='utf-8') as f:
+                return {pair.get("image") for pair in json.load(f)}
+        except Exception as e:
+            # 書き込み途中などで読めない場合は削除を見送る
+            logger.warning(f"[[RETENTION]] Could not read {self.pairs_file}: {e}")
+            return None
+
+    def _prune_processed(self, budget):
+        """MessagePairs から外れた処理済み画像を削除"""
+        if budget <= 0:
+            return 0
+        referenced = self._referenced_images()
+        if referenced is None:
+            return 0
+
+        now = time.time()
+        deleted = 0
+        for entry in sorted(_scan(self.capture_dir, "camera_", ".png"), key=lambda e: e.name):
+            if deleted >= budget:
+                break
+            if entry.name in referenced or now - entry.stat().st_mtime < self.grace_seconds:
+                continue
+            if _remove(entry.path):
+                deleted += 1
+        return deleted
+
+    def _raw_entries(self):
+        """raw画像を新しい順に（ファイル名のタイムスタンプ順）"""
+        return sorted(_scan(self.raw_dir, "raw_", ".jpg"), key=lambda e: e.name, reverse=True)
+
+    def _enforce_raw_budget(self, budget):
+        """保持日数・合計サイズを超えたraw画像を古い順に削除"""
+        if budget <= 0:
+            return 0
+        entries = self._raw_entries()
+        now = time.time()
+        total = sum(e.stat().st_size for e in entries)
+
+        deleted = 0
+        for entry in reversed(entries):
+            if deleted >= budget:
+                break
+            expired = self.max_age_days is not None and now - entry.stat().st_mtime > self.max_age_days * 86400
+            if not expired and total <= self.max_raw_bytes:
+                break
+            size = entry.stat().st_size
+            if _remove(entry.path):
+                total -= size
+                deleted += 1
+        return deleted
+
+    def _compact_raws(self, budget):
+        """フル解像度で残す枚数より古いraw画像を縮小・再圧縮"""
+        if budget <= 0:
+            return 0
+        compacted = 0
+        for entry in self._raw_entries()[self.raw_keep_full:]:
+            if compacted >= budget:
+                break
+            if entry.name.endswith(COMPACTED_SUFFIX):
+                continue
+            if self._compact(entry.path):
+                compacted += 1
+        return compacted
+
+    def _compact(self, path):
+        # 保持日数の判定は更新時刻で行うため、縮小後も元の時刻を引き継ぐ
+        original_stat = os.stat(path)
+        image = cv2.imread(path)
+        if image is None:
+            logger.warning(f"[[RETENTION]] Could not read raw image: {path}")
+            return False
+
+        h, w = image.shape[:2]
+        scale = self.raw_long_side / max(h, w)
+        if scale < 1.0:
+            image = cv2.resize(image, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.raw_quality])
+        if not ok:
+            return False
+
+        compact_path = path[:-len(".jpg")] + COMPACTED_SUFFIX
+        tmp_path = compact_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded.tobytes())
+        os.utime(tmp_path, ns=(original_stat.st_atime_ns, original_stat.st_mtime_ns))
+        os.replace(tmp_path, compact_path)
+        _remove(path)
+        return True
+
+
+def _scan(directory, prefix, suffix):
+    if not os.path.isdir(directory):
+        return []
+    with os.scandir(directory) as it:
+        return [e for e in it if e.is_file() and e.name.startswith(prefix) and e.name.endswith(suffix)]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        logger.warning(f"[[RETENTION]] Failed to delete {path}: {e}")
+        return False
@@ -0,0 +1,110 @@
+"""
+stage_timing.py - 処理ステージごとのレイテンシ計測
+
+来場者1人ぶんの各ステージ所要時間を単調時計 (time.monotonic) で計測し、
+処理完了時に機械可読な1行のサマリーを標準出力に出す。
+
+    [[TIMING]] {"visitor": "20251218_153012_123", "total_ms": 18234.5, "stages": {"capture": 412.3, ...}}
+
+また、ステージごとの直近N件から p50 / p95 を計算してJSONファイルに保存する。
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class VisitorTiming:
+    """来場者1人ぶんのステージ別所要時間"""
+
+    def __init__(self, visitor_id=None):
+        self.visitor_id = visitor_id
+        self.started = time.monotonic()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        """with timing.stage("yolo"): ... でブロックの所要時間を記録"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - start)
+
+    def record(self, name, seconds):
+        """所要時間（秒）を記録（同じステージ名は加算）"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def total_seconds(self):
+        """トリガー受信からの経過時間（キュー待ちを含む）"""
+        return time.monotonic() - self.started
+
+    def summary(self):
+        return {
+            "visitor": self.visitor_id,
+            "total_ms": round(self.total_seconds() * 1000, 1),
+            "stages": {name: round(sec * 1000, 1) for name, sec in self.stages.items()},
+        }
+
+    def emit(self):
+        """[[TIMING]] 行を標準出力に出す"""
+        print(f"[[TIMING]] {json.dumps(self.summary(), ensure_ascii=False)}")
+        sys.stdout.flush()
+
+
+class TimingStats:
+    """ステージ別の直近N件から p50 / p95 を集計してファイルに保存"""
+
+    def __init__(self, path, window=200):
+        """
+        Args:
+            path: 統計を書き出すJSONファイル
+            window: ステージごとに保持する直近の件数
+        """
+        self.path = path
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, timing: VisitorTiming):
+        """1人ぶんの計測結果を追加してファイルを更新"""
+        with self._lock:
+            samples = dict(timing.stages)
+            samples["total"] = timing.total_seconds()
+            for name, seconds in samples.items():
+                self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds * 1000)
+            stats = self._percentiles()
+
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"[[TIMING]] Failed to write stats: {e}")
+
+    def _percentiles(self):
+        stats = {}
+        for name, values in self._samples.items():
+            ordered = sorted(values)
+            stats[name] = {
+                "count": len(ordered),
+                "p50_ms": round(_percentile(ordered, 50), 1),
+                "p95_ms": round(_percentile(ordered, 95), 1),
+            }
+        return stats
+
+
+def _percentile(ordered, pct):
+    """ソート済みリストの百分位（最近傍順位法）"""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
@@ -0,0 +1,230 @@
+"""
+temporal_filter.py - 複数フレームの時間方向ノイズ除去（フリッカー対策）
+
+uint8のまま、事前確保したバッファ上で画素ごとの中央値を計算する。
+float32への変換・スタック・ソートによる大きな一時配列を作らない。
+
+- median: 比較交換ネットワーク（np.minimum / np.maximum）で中央値を選択
+          （小さいN向け。大きいNは np.partition にフォールバック）
+          出力は従来の np.median(float32).astype(np.uint8) と一致する
+- trimmed_mean: 最小値・最大値を除いた平均（中央値より軽い代替）
+"""
+
+import logging
+import time
+import tracemalloc
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 比較交換ネットワークを使う最大フレーム数（これを超えると np.partition）
+SORTING_NETWORK_MAX = 9
+
+FILTER_METHODS = ("median", "trimmed_mean")
+
+
+def _transposition_network(n):
+    """奇偶転置ソートの比較器列 [(i, j), ...]（任意のnで正しいソーティングネットワーク）"""
+    return [(i, i + 1) for rnd in range(n) for i in range(rnd % 2, n - 1, 2)]
+
+
+def _prune_network(network, outputs):
+    """指定した出力ワイヤに影響しない比較器を後ろから取り除く"""
+    needed = set(outputs)
+    kept = []
+    for i, j in reversed(network):
+        if i in needed or j in needed:
+            kept.append((i, j))
+            needed.update((i, j))
+    return kept[::-1]
+
+
+def _median_wires(n):
+    """中央値の計算に必要なソート後のワイヤ（偶数なら中央2本）"""
+    k = n // 2
+    return (k,) if n % 2 else (k - 1, k)
+
+
+class TemporalFilter:
+    """フレーム列を1枚に合成する（入力フレームは変更しない）"""
+
+    def __init__(self, method="median"):
+        """
+        Args:
+            method: "median"（中央値）または "trimmed_mean"（最小・最大を除いた平均）
+        """
+        if method not in FILTER_METHODS:
+            raise ValueError(f"Unknown temporal filter method: {method}")
+        self.method = method
+        self._shape = None
+        self._pool = []
+        self._wide = None
+        self._stack = None
+        self._networks = {}
+
+    def _prepare(self, shape, n):
+        """作業バッファをフレームサイズごとに1回だけ確保"""
+        if self._shape != shape:
+            self._shape = shape
+            self._pool = []
+            self._wide = np.empty(shape, dtype=np.uint16)
+            self._stack = None
+        # 比較交換1回で最大2本の作業バッファを使う
+        while len(self._pool) < n + 1:
+            self._pool.append(np.empty(shape, dtype=np.uint8))
+
+    def apply(self, frames):
+        """
+        Args:
+            frames: 同じサイズのuint8フレームのリスト
+
+        Returns:
+            numpy.ndarray: 合成したフレーム（新規確保した出力。作業バッファとは共有しない）
+        """
+        if not frames:
+            raise ValueError("No frames to filter")
+        if len(frames) == 1:
+            return frames[0].copy()
+
+        n = len(frames)
+        self._prepare(frames[0].shape, n)
+        if self.method == "trimmed_mean" and n >= 3:
+            return self._trimmed_mean(frames)
+        if n <= SORTING_NETWORK_MAX:
+            return self._network_median(frames)
+        return self._partition_median(frames)
+
+    def _network_median(self, frames):
+        n = len(frames)
+        outputs = _median_wires(n)
+        network = self._networks.get(n)
+        if network is None:
+            network = _prune_network(_transposition_network(n), outputs)
+            self._networks[n] = network
+
+        # wires[i]: 入力フレーム（読み取りのみ）または作業バッファ
+        wires = list(frames)
+        owned = [False] * n
+        pool = list(self._pool)
+        for i, j in network:
+            lo = pool.pop()
+            np.minimum(wires[i], wires[j], out=lo)
+            if owned[j]:
+                np.maximum(wires[i], wires[j], out=wires[j])
+            else:
+                hi = pool.pop()
+                np.maximum(wires[i], wires[j], out=hi)
+                wires[j] = hi
+                owned[j] = True
+            if owned[i]:
+                pool.append(wires[i])
+            wires[i] = lo
+            owned[i] = True
+
+        if len(outputs) == 1:
+            return wires[outputs[0]].copy()
+        return self._floor_mean2(wires[outputs[0]], wires[outputs[1]])
+
+    def _floor_mean2(self, a, b):
+        """(a + b) // 2（np.median の偶数個平均を uint8 に切り捨てた値と一致）"""
+        np.add(a, b, out=self._wide, dtype=np.uint16)
+        np.right_shift(self._wide, 1, out=self._wide)
+        return self._wide.astype(np.uint8)
+
+    def _partition_median(self, frames):
+        n = len(frames)
+        if self._stack is None or self._stack.shape[0] != n:
+            self._stack = np.empty((n,) + self._shape, dtype=np.uint8)
+        for i, frame in enumerate(frames):
+            self._stack[i] = frame
+        outputs = _median_wires(n)
+        self._stack.partition(outputs, axis=0)
+        if len(outputs) == 1:
+            return self._stack[outputs[0]].copy()
+        return self._floor_mean2(self._stack[outputs[0]], self._stack[outputs[1]])
+
+    def _trimmed_mean(self, frames):
+        """最小値・最大値を1つずつ除いた平均（四捨五入）"""
+        n = len(frames)
+        lo, hi = self._pool[0], self._pool[1]
+        total = self._wide
+        np.minimum(frames[0], frames[1], out=lo)
+        np.maximum(frames[0], frames[1], out=hi)
+        np.add(frames[0], frames[1], out=total, dtype=np.uint16)
+        for frame in frames[2:]:
+            np.minimum(lo, frame, out=lo)
+            np.maximum(hi, frame, out=hi)
+            np.add(total, frame, out=total, casting="unsafe")
+        np.subtract(total, lo, out=total, casting="unsafe")
+        np.subtract(total, hi, out=total, casting="unsafe")
+
+        count = n - 2
+        np.add(total, count // 2, out=total, casting="unsafe")
+        np.floor_divide(total, count, out=total, casting="unsafe")
+        return total.astype(np.uint8)
+
+
+def legacy_median(frames):
+    """従来の実装（float32スタック + np.median）"""
+    stack = np.stack([f.astype(np.float32) for f in frames])
+    return np.median(stack, axis=0).astype(np.uint8)
+
+
+def benchmark(shape=(2160, 3840, 3), frame_counts=(3, 5), repeats=3, seed=0):
+    """
+    従来実装との処理時間・ピークメモリ・出力差を比較する
+
+    Returns:
+        list: [{"frames", "method", "ms", "peak_mb", "max_diff"}, ...]
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for n in frame_counts:
+        base = rng.integers(0, 256, size=shape, dtype=np.uint8)
+        frames = [np.clip(base.astype(np.int16) + rng.integers(-20, 21, size=shape), 0, 255).astype(np.uint8)
+                  for _ in range(n)]
+        reference = legacy_median(frames)
+
+        candidates = [("legacy", legacy_median)]
+        for method in FILTER_METHODS:
+            temporal_filter = TemporalFilter(method)
+            temporal_filter.apply(frames)  # バッファ確保を計測から除外
+            candidates.append((method, temporal_filter.apply))
+
+        for name, func in candidates:
+            tracemalloc.start()
+            start = time.perf_counter()
+            for _ in range(repeats):
+                output = func(frames)
+            elapsed = (time.perf_counter() - start) / repeats
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            diff = np.abs(output.astype(np.int16) - reference.astype(np.int16))
+            results.append({
+                "frames": n,
+                "method": name,
+                "ms": elapsed * 1000,
+                "peak_mb": peak / 1e6,
+                "max_diff": int(diff.max()),
+            })
+    return results
+
+
+# モジュールテスト用
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    # python temporal_filter.py [width height]
+    if len(sys.argv) >= 3:
+        shape = (int(sys.argv[2]), int(sys.argv[1]), 3)
+    else:
+        shape = (2160, 3840, 3)
+
+    print(f"=== Temporal Filter ベンチマーク ({shape[1]}x{shape[0]}) ===")
+    for r in benchmark(shape):
+        print(f"  N={r['frames']} {r['method']:<13} {r['ms']:8.1f} ms  "
+              f"peak={r['peak_mb']:7.1f} MB  max_diff={r['max_diff']}")
@@ -0,0 +1,66 @@
+"""
+test_item_matcher.py - ItemMatcher の回帰テスト
+
+複合語の一部だけがエイリアスに一致する名前を、別の正規名に書き換えないことを確認する。
+
+使い方:
+    python3 -m unittest test_item_matcher
+"""
+
+import logging
+import unittest
+
+from item_matcher import ItemMatcher
+
+logging.disable(logging.CRITICAL)
+
+
+class ItemMatcherTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.matcher = ItemMatcher()
+
+    def test_exact_aliases(self):
+        cases = {
+            "ボールペン": "pen",
+            "ｽﾏﾎ": "smartphone",
+            "Water Bottle": "bottle",
+            "cell phone": "smartphone",
+            "pencil case": "pencil case",
+            "スマートフォン": "smartphone",
+        }
+        for name, expected in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(self.matcher.match(name), expected)
+
+    def test_plurals(self):
+        for name, expected in {"pens": "pen", "notebooks": "notebook", "Water Bottles": "bottle"}.items():
+            with self.subTest(name=name):
+                self.assertEqual(self.matcher.match(name), expected)
+
+    def test_compound_nouns_keep_original_name(self):
+        names = [
+            "歯ブラシ", "ノートパソコン", "スマホスタンド", "phone stand", "can opener",
+            "ボトルキャップ", "メガネケース", "ペン立て", "pen holder", "カードケース",
+            "card reader", "sticky note", "watch band",
+        ]
+        for name in names:
+            with self.subTest(name=name):
+                self.assertEqual(self.matcher.match_local(name), (None, None))
+                self.assertEqual(self.matcher.match(name), name)
+
+    def test_partial_match_goes_to_fallback(self):
+        calls = []
+
+        def fallback(name, known_items):
+            calls.append(name)
+            return "fallback"
+
+        matcher = ItemMatcher(fallback=fallback)
+        self.assertEqual(matcher.match("pen holder"), "fallback")
+        self.assertEqual(matcher.match("ボールペン"), "pen")
+        self.assertEqual(calls, ["pen holder"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+"""
+test_item_obsessions.py - 本音指示キーワード照合 (match_obsession) の回帰テスト
+
+日本語のキーワードが別の語の一部に一致しないことを確認する。
+
+使い方:
+    python3 -m unittest test_item_obsessions
+"""
+
+import logging
+import unittest
+
+import item_obsessions
+
+logging.disable(logging.CRITICAL)
+
+
+class MatchObsessionTest(unittest.TestCase):
+    def assertAlias(self, name, alias):
+        match = item_obsessions.match_obsession(name)
+        self.assertIsNotNone(match, name)
+        self.assertEqual(match["alias"], alias)
+
+    def test_katakana_word_does_not_match_inside_longer_word(self):
+        for name in ["ペンギン", "ノートパソコン", "ぺんぎん"]:
+            with self.subTest(name=name):
+                self.assertIsNone(item_obsessions.match_obsession(name))
+                self.assertIsNone(item_obsessions.get_obsession_instruction(name))
+
+    def test_japanese_keywords_still_match(self):
+        self.assertAlias("ボールペン", "ぼーるぺん")
+        self.assertAlias("ノート", "のーと")
+        self.assertAlias("赤いペン", "ぺん")
+        self.assertAlias("青いノート", "のーと")
+        self.assertAlias("ｽﾏﾎ", "すまほ")
+
+    def test_english_word_boundaries(self):
+        self.assertIsNone(item_obsessions.match_obsession("open book"))
+        self.assertAlias("blue pens", "pen")
+
+
+if __name__ == "__main__":
+    unittest.main()
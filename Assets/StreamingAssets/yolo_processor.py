@@ -7,54 +7,283 @@ YOLO26による物体検出を行い、検出結果をOllamaへのヒントと
 - 0検出: 元画像をそのまま返す
 - 1検出: そのオブジェクトをクロップ（マージン付き）
 - 2+検出: 全オブジェクトを含む最小バウンディングボックスでクロップ
+
+検出結果 (Detections):
+- boxes.data から1回の転送で構造化NumPy配列（座標・信頼度・クラスID・面積）に取り出し、
+  統合ボックス・primary・面積はベクトル演算で求める
+- detection_info["detections"] は従来通り dict のリストとして読めるが、
+  dict はログ・Unity向けに参照されたときに初めて作られる
+
+検出入力サイズ (detect_long_side):
+- 指定時は長辺をそのサイズに縮小した画像（再利用バッファ）で検出し、
+  ボックスを元解像度の座標に戻す（クロップは元画像から行う）
+
+2段構成 (CascadeYOLOProcessor):
+- nanoモデルで先に検出し、検出なし・低信頼度・誤検出しやすいクラスの場合だけ YOLO-World を実行
+
+推論バックエンド (backend):
+- "torch": .pt をPyTorchで実行（従来通り）
+- "onnx" / "openvino": YOLO-Worldのカスタム語彙を埋め込んだ状態で1回だけエクスポートし、
+  yolo_exports/ にキャッシュしてCPU向けランタイムで実行（語彙・モデルが変わると再エクスポート）
+
+計測結果と既定値:
+- 展示PCでの計測はまだ記録されていないため、既定値は従来どおり
+  （backend="torch"、detect_long_side=None = 元解像度、imgsz=640）
+- 変更する場合は、展示PCで実際のキャプチャ画像を使って以下を実行し、
+  結果（ms/frame と recall / meanIoU）をここに記録してから main_vision_voice.py の
+  YOLO_BACKEND / YOLO_DETECT_LONG_SIDE を切り替える
+    python yolo_processor.py <image> --benchmark torch onnx openvino
+    python yolo_processor.py <image> --sizes 320 480 640
 """
 
 import cv2
 import numpy as np
+import hashlib
+import json
 import logging
+import os
+import shutil
+import time
 from ultralytics import YOLO
 
 # YOLO-World用クラス定義をインポート
 from yolo_world_classes import YOLO_WORLD_CLASSES
+from yolo_text_cache import TextEmbeddingCache
 
 logger = logging.getLogger(__name__)
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORT_DIR = os.path.join(SCRIPT_DIR, "yolo_exports")
+
+# backend名 → (ultralyticsのエクスポート形式, 出力パスの接尾辞)
+EXPORT_BACKENDS = {
+    "onnx": ("onnx", ".onnx"),
+    "openvino": ("openvino", "_openvino_model"),
+}
+
+
+# 検出1件分のレコード（座標は元画像の解像度）
+DETECTION_DTYPE = np.dtype([
+    ("x1", np.int32), ("y1", np.int32), ("x2", np.int32), ("y2", np.int32),
+    ("confidence", np.float32), ("class_id", np.int32), ("area", np.int64),
+])
+
+
+class Detections:
+    """
+    検出結果の構造化配列
+
+    従来の dict のリストと同じように len() / 反復 / インデックスで読める
+    （dict は最初に参照されたときにまとめて作る）。
+    """
+
+    def __init__(self, records, names):
+        """
+        Args:
+            records: DETECTION_DTYPE の配列
+            names: クラスID → クラス名 (model.names)
+        """
+        self.records = records
+        self.names = names
+        self._dicts = None
+
+    @classmethod
+    def from_results(cls, results, names, scale=(1.0, 1.0), size=None):
+        """
+        ultralytics の推論結果から作る
+
+        Args:
+            results: model() の戻り値
+            names: クラスID → クラス名
+            scale: (scale_x, scale_y) 検出画像 / 元画像。座標を元解像度に戻すのに使う
+            size: (w, h) 元画像のサイズ（座標をこの範囲に収める）
+        """
+        chunks = []
+        for result in results:
+            if result.boxes is None:
+                continue
+            # [x1, y1, x2, y2, (track_id,) conf, cls] を1回でCPUへ転送
+            data = result.boxes.data
+            data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+            if len(data):
+                chunks.append(data)
+        if not chunks:
+            return cls(np.zeros(0, dtype=DETECTION_DTYPE), names)
+
+        data = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+        boxes = data[:, :4] / np.array([scale[0], scale[1], scale[0], scale[1]])
+        if size is not None:
+            boxes = np.minimum(boxes, [size[0], size[1], size[0], size[1]])
+
+        records = np.empty(len(data), dtype=DETECTION_DTYPE)
+        for i, key in enumerate(("x1", "y1", "x2", "y2")):
+            records[key] = boxes[:, i]  # int への変換は切り捨て（従来の int() と同じ）
+        records["confidence"] = data[:, -2]
+        records["class_id"] = data[:, -1]
+        records["area"] = (records["x2"].astype(np.int64) - records["x1"]) * (records["y2"] - records["y1"])
+        return cls(records, names)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return f"Detections({self.to_dicts()!r})"
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    def __getitem__(self, index):
+        return self.to_dicts()[index]
+
+    def class_name(self, class_id):
+        return self.names[int(class_id)]
+
+    @property
+    def class_names(self):
+        return [self.class_name(c) for c in self.records["class_id"]]
+
+    def union_box(self):
+        """全検出を含むボックス (x1, y1, x2, y2)"""
+        r = self.records
+        return int(r["x1"].min()), int(r["y1"].min()), int(r["x2"].max()), int(r["y2"].max())
+
+    def primary_index(self):
+        """最も信頼度の高い検出のインデックス（同点なら先の検出）"""
+        return int(np.argmax(self.records["confidence"]))
+
+    def boxes(self, mask=None):
+        """座標の (N, 4) 配列 [x1, y1, x2, y2]"""
+        r = self.records if mask is None else self.records[mask]
+        return np.stack([r["x1"], r["y1"], r["x2"], r["y2"]], axis=1)
+
+    def class_mask(self, class_names):
+        """クラス名（小文字で比較）がいずれかに一致する検出のマスク"""
+        targets = {c.lower() for c in class_names}
+        ids = [i for i, n in (self.names.items() if isinstance(self.names, dict) else enumerate(self.names))
+               if n.lower() in targets]
+        return np.isin(self.records["class_id"], ids)
+
+    def to_dicts(self):
+        """ログ・Unity向けの dict のリスト（初回のみ作成）"""
+        if self._dicts is None:
+            self._dicts = [{
+                "x1": int(r["x1"]), "y1": int(r["y1"]), "x2": int(r["x2"]), "y2": int(r["y2"]),
+                "confidence": float(r["confidence"]),
+                "class_id": int(r["class_id"]),
+                "class_name": self.class_name(r["class_id"]),
+                "area": int(r["area"]),
+            } for r in self.records]
+        return self._dicts
+
+
+def vocabulary_key(model_name, classes, *extra):
+    """モデル名とクラスリスト（順序込み）から短いハッシュを作る（キャッシュのキー）"""
+    payload = json.dumps([os.path.basename(model_name), list(classes or []), *extra], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
 
 class YOLOProcessor:
     """YOLO26によるオブジェクト検出とクロップ処理"""
     
-    def __init__(self, model_name="yolov8s-worldv2.pt", confidence_threshold=0.25, margin_ratio=0.1):
+    def __init__(self, model_name="yolov8s-worldv2.pt", confidence_threshold=0.25, margin_ratio=0.1,
+                 backend="torch", export_dir=EXPORT_DIR, imgsz=640, detect_long_side=None):
         """
         Args:
             model_name: 使用するYOLOモデル名 (デフォルト: yolo11n.pt)
             confidence_threshold: 検出の信頼度閾値
             margin_ratio: クロップ時のマージン比率 (0.1 = 10%)
+            backend: 推論バックエンド ("torch", "onnx", "openvino")
+            export_dir: エクスポートしたモデルのキャッシュ先
+            imgsz: 推論サイズ（エクスポート時の最大サイズにも使用）
+            detect_long_side: 検出前に長辺をこのサイズへ縮小する（Noneで元画像をそのまま渡す）。
+                              指定時は推論サイズもこの値になる（32の倍数にすること）
         """
+        if backend != "torch" and backend not in EXPORT_BACKENDS:
+            raise ValueError(f"Unknown YOLO backend: {backend}")
         self.model_name = model_name
         self.confidence_threshold = confidence_threshold
         self.margin_ratio = margin_ratio
+        self.backend = backend
+        self.export_dir = export_dir
+        self.imgsz = imgsz
+        self.detect_long_side = detect_long_side
+        self._detect_buffer = None
         self.model = None
         self._is_initialized = False
-    
+
+    @property
+    def is_world_model(self):
+        return "world" in self.model_name.lower()
+
     def initialize(self):
         """モデルを初期化（初回のみ）"""
         if self._is_initialized:
             return True
         
-        logger.info(f"[YOLO-World] Loading model: {self.model_name}")
+        logger.info(f"[YOLO-World] Loading model: {self.model_name} (backend={self.backend})")
         try:
-            self.model = YOLO(self.model_name)
-            # YOLO-World: カスタムクラスを設定
-            if "world" in self.model_name.lower():
-                self.model.set_classes(YOLO_WORLD_CLASSES)
-                logger.info(f"[YOLO-World] Set {len(YOLO_WORLD_CLASSES)} custom classes")
+            if self.backend == "torch":
+                self.model = self._load_torch_model()
+            else:
+                try:
+                    self.model = self._load_exported_model()
+                except Exception as e:
+                    logger.warning(f"[YOLO] {self.backend} backend unavailable ({e}), falling back to torch")
+                    self.backend = "torch"
+                    self.model = self._load_torch_model()
             self._is_initialized = True
             logger.info("[YOLO-World] Model loaded successfully")
             return True
         except Exception as e:
             logger.error(f"[YOLO] Failed to load model: {e}")
             return False
+
+    def _load_torch_model(self):
+        model = YOLO(self.model_name)
+        # YOLO-World: カスタムクラスを設定（テキスト埋め込みはディスクキャッシュを再利用）
+        if self.is_world_model:
+            TextEmbeddingCache(self.model_name).set_classes(model, YOLO_WORLD_CLASSES)
+            logger.info(f"[YOLO-World] Set {len(YOLO_WORLD_CLASSES)} custom classes")
+        return model
+
+    def export_path(self):
+        """現在のモデル・語彙・バックエンドに対応するエクスポート先"""
+        export_format, suffix = EXPORT_BACKENDS[self.backend]
+        classes = YOLO_WORLD_CLASSES if self.is_world_model else []
+        key = vocabulary_key(self.model_name, classes, export_format, self.imgsz)
+        stem = os.path.splitext(os.path.basename(self.model_name))[0]
+        return os.path.join(self.export_dir, f"{stem}-{key}{suffix}")
+
+    def _load_exported_model(self):
+        """
+        語彙を埋め込んだエクスポート済みモデルを読み込む（なければ1回だけエクスポート）
+        """
+        path = self.export_path()
+        if os.path.exists(path):
+            logger.info(f"[YOLO] Using cached {self.backend} export: {os.path.basename(path)}")
+        else:
+            export_format, _ = EXPORT_BACKENDS[self.backend]
+            logger.info(f"[YOLO] Exporting {self.model_name} to {self.backend} (first run only)...")
+            start = time.monotonic()
+            # dynamic=True: PyTorchと同じ矩形レターボックスで推論させ、検出結果を揃える
+            exported = self._load_torch_model().export(format=export_format, imgsz=self.imgsz, dynamic=True)
+            os.makedirs(self.export_dir, exist_ok=True)
+            shutil.move(str(exported), path)
+            logger.info(f"[YOLO] Export complete ({time.monotonic() - start:.1f}s): {os.path.basename(path)}")
+        # エクスポート済みモデルはメタデータにクラス名を持つ
+        return YOLO(path, task="detect")
     
+    def warmup(self):
+        """
+        モデルのロードとダミー推論を行う（初回来場者の待ち時間対策）
+        """
+        if not self.initialize():
+            return False
+        dummy = np.zeros((480, 640, 3), dtype=np.uint8)
+        self.model(dummy, conf=self.confidence_threshold, imgsz=self.imgsz, verbose=False)
+        logger.info("[YOLO] Warm-up complete")
+        return True
+
     def detect_and_crop(self, image: np.ndarray) -> tuple:
         """
         画像内のオブジェクトを検出し、適切にクロップする
@@ -67,37 +296,43 @@ class YOLOProcessor:
                 - cropped_image: クロップ済み画像
                 - detection_info: 検出情報の辞書
         """
+        detections = self.detect(image)
+        if detections is None:
+            return image, {"error": "Model initialization failed", "detection_count": 0}
+        return self.crop(image, detections)
+
+    def detect(self, image: np.ndarray):
+        """
+        検出のみを行う
+
+        Returns:
+            Detections: 元解像度の座標の検出結果（モデルの初期化に失敗した場合はNone）
+        """
         if not self._is_initialized:
             if not self.initialize():
-                return image, {"error": "Model initialization failed", "detection_count": 0}
+                return None
         
         h, w = image.shape[:2]
         
-        # YOLO推論
-        logger.info("[YOLO] Running detection...")
-        results = self.model(image, conf=self.confidence_threshold, verbose=False)
-        
-        # 検出結果を収集
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                    conf = float(box.conf[0])
-                    cls_id = int(box.cls[0])
-                    cls_name = self.model.names[cls_id]
-                    
-                    detections.append({
-                        "x1": x1, "y1": y1, "x2": x2, "y2": y2,
-                        "confidence": conf,
-                        "class_id": cls_id,
-                        "class_name": cls_name,
-                        "area": (x2 - x1) * (y2 - y1)
-                    })
+        # YOLO推論（必要なら縮小画像で検出）
+        logger.info(f"[YOLO] Running detection ({os.path.basename(self.model_name)})...")
+        detect_image, (scale_x, scale_y) = self._detection_input(image)
+        results = self.model(detect_image, conf=self.confidence_threshold,
+                             imgsz=self.detect_long_side or self.imgsz, verbose=False)
         
+        # 検出結果を収集（ボックスは元解像度の座標に戻す）
+        detections = Detections.from_results(results, self.model.names, (scale_x, scale_y), (w, h))
+        logger.info(f"[YOLO] Detected {len(detections)} objects")
+        return detections
+
+    def crop(self, image: np.ndarray, detections) -> tuple:
+        """
+        検出結果に応じてクロップする（detect_and_crop の後半）
+
+        Returns:
+            tuple: (cropped_image, detection_info)
+        """
         detection_count = len(detections)
-        logger.info(f"[YOLO] Detected {detection_count} objects")
         
         # 検出数に応じた処理
         if detection_count == 0:
@@ -114,31 +349,27 @@ class YOLOProcessor:
         
         elif detection_count == 1:
             # 単一検出: そのオブジェクトをクロップ
-            det = detections[0]
-            cropped, crop_box = self._crop_with_margin(image, det["x1"], det["y1"], det["x2"], det["y2"])
-            logger.info(f"[YOLO-World] Single object crop: {det['class_name']} ({det['confidence']:.2f})")
+            cropped, crop_box = self._crop_with_margin(image, *detections.union_box())
+            class_name = detections.class_names[0]
+            confidence = float(detections.records["confidence"][0])
+            logger.info(f"[YOLO-World] Single object crop: {class_name} ({confidence:.2f})")
             return cropped, {
                 "detection_count": 1,
                 "crop_type": "single",
                 "detections": detections,
                 "crop_box": crop_box,
-                "detected_classes": [det["class_name"]],
-                "primary_class": det["class_name"],
-                "primary_confidence": det["confidence"]
+                "detected_classes": [class_name],
+                "primary_class": class_name,
+                "primary_confidence": confidence
             }
         
         else:
             # 複数検出: 全オブジェクトを含む統合バウンディングボックス
-            min_x1 = min(d["x1"] for d in detections)
-            min_y1 = min(d["y1"] for d in detections)
-            max_x2 = max(d["x2"] for d in detections)
-            max_y2 = max(d["y2"] for d in detections)
-            
-            cropped, crop_box = self._crop_with_margin(image, min_x1, min_y1, max_x2, max_y2)
-            class_names = [d["class_name"] for d in detections]
+            cropped, crop_box = self._crop_with_margin(image, *detections.union_box())
+            class_names = detections.class_names
             
             # 最も信頼度の高い検出を primary とする
-            primary_det = max(detections, key=lambda d: d["confidence"])
+            primary = detections.primary_index()
             
             logger.info(f"[YOLO-World] Multi-object crop: {class_names}")
             return cropped, {
@@ -147,10 +378,30 @@ class YOLOProcessor:
                 "detections": detections,
                 "crop_box": crop_box,
                 "detected_classes": class_names,
-                "primary_class": primary_det["class_name"],
-                "primary_confidence": primary_det["confidence"]
+                "primary_class": class_names[primary],
+                "primary_confidence": float(detections.records["confidence"][primary])
             }
     
+    def _detection_input(self, image: np.ndarray) -> tuple:
+        """
+        検出用の入力画像と縮小率を返す（縮小画像は同じサイズなら毎回同じバッファに書き込む）
+
+        Returns:
+            tuple: (detect_image, (scale_x, scale_y))  scale = 検出画像 / 元画像
+        """
+        h, w = image.shape[:2]
+        if not self.detect_long_side or max(h, w) <= self.detect_long_side:
+            return image, (1.0, 1.0)
+
+        scale = self.detect_long_side / max(h, w)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        if self._detect_buffer is None or self._detect_buffer.shape[:2] != (size[1], size[0]) \
+                or self._detect_buffer.shape[2:] != image.shape[2:]:
+            self._detect_buffer = np.empty((size[1], size[0]) + image.shape[2:], dtype=image.dtype)
+        cv2.resize(image, size, dst=self._detect_buffer, interpolation=cv2.INTER_AREA)
+        # 丸め誤差を避けるため、実際のサイズから縦横それぞれの縮小率を求める
+        return self._detect_buffer, (size[0] / w, size[1] / h)
+
     def _crop_with_margin(self, image: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> tuple:
         """
         マージンを含めてクロップ
@@ -196,16 +447,245 @@ class YOLOProcessor:
         return output
 
 
+class CascadeYOLOProcessor:
+    """
+    2段構成の検出: 軽量なnanoモデル（COCOの固定クラス）を先に実行し、
+    結果が信用できない場合だけ YOLO-World（カスタム語彙）で検出し直す
+
+    YOLO-World を実行する条件:
+    - nanoの検出なし ("empty")
+    - 最も高い信頼度が min_confidence 未満 ("low_confidence")
+    - distrusted_classes のクラスを検出（台を cell phone と誤検出する等） ("distrusted")
+
+    YOLOProcessor と同じ detect_and_crop / warmup を持ち、detection_info には
+    どちらの段で確定したか ("tier": "fast" / "world") と理由 ("cascade_reason") を加える。
+    段ごとの確定回数は tier_counts() と [[YOLO]] ログで確認できる。
+    """
+
+    def __init__(self, fast_model_name="yolo11n.pt", world_model_name="yolov8s-worldv2.pt",
+                 min_confidence=0.5, distrusted_classes=("cell phone",), **kwargs):
+        """
+        Args:
+            fast_model_name: 1段目のnanoモデル (yolo11n.pt / yolo26n.pt)
+            world_model_name: 2段目のYOLO-Worldモデル
+            min_confidence: 1段目の結果を採用する最低信頼度（最も信頼度の高い検出で判定）
+            distrusted_classes: 1段目で検出されたら2段目に回すクラス名
+            **kwargs: 両方の YOLOProcessor に渡す引数（backend, detect_long_side など）
+        """
+        self.fast = YOLOProcessor(model_name=fast_model_name, **kwargs)
+        self.world = YOLOProcessor(model_name=world_model_name, **kwargs)
+        self.min_confidence = min_confidence
+        self.distrusted_classes = list(distrusted_classes)
+        self._counts = {"fast": 0, "empty": 0, "low_confidence": 0, "distrusted": 0, "fast_unavailable": 0}
+
+    def initialize(self):
+        # nanoモデルが使えなくても YOLO-World だけで動作できる（"fast_unavailable" として集計）
+        fast_ok = self.fast.initialize()
+        return self.world.initialize() or fast_ok
+
+    def warmup(self):
+        """両方のモデルをロードしてダミー推論を行う"""
+        fast_ok = self.fast.warmup()
+        return self.world.warmup() or fast_ok
+
+    def tier_counts(self):
+        """
+        Returns:
+            dict: {"fast": nanoで確定した回数,
+                   "empty" / "low_confidence" / "distrusted" / "fast_unavailable": 理由別のYOLO-World実行回数}
+        """
+        return dict(self._counts)
+
+    def _escalation_reason(self, detections):
+        """1段目の結果を採用しない理由（採用するならNone）"""
+        if not len(detections):
+            return "empty"
+        if detections.class_mask(self.distrusted_classes).any():
+            return "distrusted"
+        if detections.records["confidence"].max() < self.min_confidence:
+            return "low_confidence"
+        return None
+
+    def detect_and_crop(self, image: np.ndarray) -> tuple:
+        """YOLOProcessor.detect_and_crop と同じ（必要な場合のみ YOLO-World を実行）"""
+        detections = self.fast.detect(image)
+        reason = "fast_unavailable" if detections is None else self._escalation_reason(detections)
+
+        if reason is None:
+            processor, tier = self.fast, "fast"
+            self._counts["fast"] += 1
+        else:
+            processor, tier = self.world, "world"
+            self._counts[reason] += 1
+            detections = self.world.detect(image)
+            if detections is None:
+                return image, {"error": "Model initialization failed", "detection_count": 0}
+
+        counts = self._counts
+        world_total = sum(counts.values()) - counts["fast"]
+        logger.info(f"[[YOLO]] Cascade: {tier} ({reason or 'confident'}) | "
+                    f"fast={counts['fast']} world={world_total} "
+                    f"(empty={counts['empty']}, low_conf={counts['low_confidence']}, "
+                    f"distrusted={counts['distrusted']}, fast_unavailable={counts['fast_unavailable']})")
+
+        cropped, info = processor.crop(image, detections)
+        info["tier"] = tier
+        info["cascade_reason"] = reason
+        return cropped, info
+
+
+def benchmark_backends(image, backends=("torch", "onnx", "openvino"), runs=10, model_name="yolov8s-worldv2.pt"):
+    """
+    バックエンドごとの1フレームあたりの推論時間と、torchとの検出結果の一致を比較する
+
+    Returns:
+        list: [{"backend", "ms", "detection_count", "classes", "same_classes", "max_box_diff"}, ...]
+    """
+    results = []
+    reference = None
+    for backend in backends:
+        processor = YOLOProcessor(model_name=model_name, backend=backend)
+        if not processor.warmup() or processor.backend != backend:
+            results.append({"backend": backend, "error": "unavailable"})
+            continue
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            _, info = processor.detect_and_crop(image)
+        elapsed = (time.perf_counter() - start) / runs
+
+        detections = info.get("detections", [])
+        row = {
+            "backend": backend,
+            "ms": elapsed * 1000,
+            "detection_count": info["detection_count"],
+            "classes": info["detected_classes"],
+        }
+        if reference is None:
+            reference = detections
+        else:
+            row["same_classes"] = [d["class_name"] for d in detections] == [d["class_name"] for d in reference]
+            if row["same_classes"] and detections:
+                row["max_box_diff"] = max(abs(d[k] - r[k]) for d, r in zip(detections, reference)
+                                          for k in ("x1", "y1", "x2", "y2"))
+        results.append(row)
+    return results
+
+
+def _box_iou(a, b):
+    ix = max(0, min(a["x2"], b["x2"]) - max(a["x1"], b["x1"]))
+    iy = max(0, min(a["y2"], b["y2"]) - max(a["y1"], b["y1"]))
+    inter = ix * iy
+    union = a["area"] + b["area"] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def benchmark_detect_sizes(image, sizes=(320, 480, 640), runs=10, model_name="yolov8s-worldv2.pt"):
+    """
+    検出入力サイズごとの処理時間と、元画像を渡した場合（従来）の検出との一致度を比較する
+
+    一致度: 同じクラスで IoU >= 0.5 の検出を1対1で対応付け、
+            recall（従来検出のうち見つかった割合）と対応した検出の平均IoUを求める
+
+    Returns:
+        list: [{"size", "ms", "detection_count", "recall", "mean_iou"}, ...]
+    """
+    reference_processor = YOLOProcessor(model_name=model_name)
+    reference_processor.warmup()
+
+    results = []
+    reference = None
+    for size in (None,) + tuple(sizes):
+        processor = YOLOProcessor(model_name=model_name, detect_long_side=size)
+        processor.model = reference_processor.model
+        processor._is_initialized = True
+        processor.detect_and_crop(image)  # バッファ確保を計測から除外
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            _, info = processor.detect_and_crop(image)
+        elapsed = (time.perf_counter() - start) / runs
+
+        detections = info.get("detections", [])
+        if reference is None:
+            reference = detections
+
+        matched_ious = []
+        unmatched = list(detections)
+        for ref in reference:
+            candidates = [(_box_iou(ref, d), i) for i, d in enumerate(unmatched) if d["class_name"] == ref["class_name"]]
+            if candidates:
+                iou, index = max(candidates)
+                if iou >= 0.5:
+                    matched_ious.append(iou)
+                    unmatched.pop(index)
+
+        results.append({
+            "size": size,
+            "ms": elapsed * 1000,
+            "detection_count": info["detection_count"],
+            "recall": len(matched_ious) / len(reference) if reference else 1.0,
+            "mean_iou": float(np.mean(matched_ious)) if matched_ious else 0.0,
+        })
+    return results
+
+
 # モジュールテスト用
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(message)s')
     
     print("=== YOLO Processor テスト ===")
     
+    import sys
+    if len(sys.argv) > 2 and sys.argv[2] == "--benchmark":
+        # バックエンド比較: python yolo_processor.py <image_path> --benchmark [backend ...]
+        img = cv2.imread(sys.argv[1])
+        if img is None:
+            print(f"Failed to load: {sys.argv[1]}")
+            sys.exit(1)
+        backends = sys.argv[3:] or ["torch", "onnx", "openvino"]
+        for r in benchmark_backends(img, backends):
+            if "error" in r:
+                print(f"  {r['backend']:<9} {r['error']}")
+                continue
+            match = "" if "same_classes" not in r else \
+                f"  same_classes={r['same_classes']} max_box_diff={r.get('max_box_diff', 0)}px"
+            print(f"  {r['backend']:<9} {r['ms']:8.1f} ms/frame  {r['detection_count']} det {r['classes']}{match}")
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[2] == "--sizes":
+        # 入力サイズ比較: python yolo_processor.py <image_path> --sizes [320 480 640]
+        img = cv2.imread(sys.argv[1])
+        if img is None:
+            print(f"Failed to load: {sys.argv[1]}")
+            sys.exit(1)
+        sizes = [int(v) for v in sys.argv[3:]] or [320, 480, 640]
+        print(f"Input: {img.shape[1]}x{img.shape[0]}")
+        for r in benchmark_detect_sizes(img, sizes):
+            label = "full-res" if r["size"] is None else f"{r['size']}px"
+            print(f"  {label:<9} {r['ms']:8.1f} ms  {r['detection_count']} det  "
+                  f"recall={r['recall']:.2f}  meanIoU={r['mean_iou']:.3f}")
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[2] == "--cascade":
+        # 2段構成の判定集計: python yolo_processor.py <image_dir> --cascade [fast_model]
+        paths = sorted(os.path.join(sys.argv[1], f) for f in os.listdir(sys.argv[1])
+                       if f.lower().endswith((".jpg", ".jpeg", ".png")))
+        cascade = CascadeYOLOProcessor(*sys.argv[3:4])
+        start = time.perf_counter()
+        for path in paths:
+            img = cv2.imread(path)
+            if img is not None:
+                _, info = cascade.detect_and_crop(img)
+                print(f"  {os.path.basename(path)}: {info.get('tier')} ({info.get('cascade_reason') or 'confident'}) "
+                      f"-> {info.get('primary_class')}")
+        elapsed = time.perf_counter() - start
+        print(f"Tier counts: {cascade.tier_counts()}  ({elapsed / max(1, len(paths)) * 1000:.1f} ms/image)")
+        sys.exit(0)
+
     processor = YOLOProcessor()
     
     # テスト画像を読み込み
-    import sys
     if len(sys.argv) > 1:
         img = cv2.imread(sys.argv[1])
         if img is not None:
@@ -216,4 +696,5 @@ if __name__ == "__main__":
         else:
             print(f"Failed to load: {sys.argv[1]}")
     else:
-        print("Usage: python yolo_processor.py <image_path>")
+        print("Usage: python yolo_processor.py <image_path> [--benchmark [backend ...] | --sizes [size ...]]")
+        print("       python yolo_processor.py <image_dir> --cascade [fast_model]")
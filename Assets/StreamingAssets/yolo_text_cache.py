@@ -0,0 +1,112 @@
+"""
+yolo_text_cache.py - YOLO-Worldのクラス名テキスト埋め込みのディスクキャッシュ
+
+model.set_classes() は毎回CLIPテキストエンコーダで全クラスを埋め込むため、
+クラスごとの埋め込みを yolo_text_embeddings/<モデル名>.npz に保存して再利用する。
+
+- クラスリスト全体（順序込み）とモデル名のハッシュが一致すればエンコードなしで適用
+- yolo_world_classes.py を編集した場合は、キャッシュにないクラスだけをエンコード
+  （各クラスの埋め込みは他のクラスに依存しないため、エントリ単位で使い回せる）
+- 内部構造が想定と違うバージョンの ultralytics では通常の set_classes() にフォールバック
+"""
+
+import hashlib
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TEXT_CACHE_DIR = os.path.join(SCRIPT_DIR, "yolo_text_embeddings")
+
+_VOCABULARY_KEY = "__vocabulary__"
+
+
+def _entry_key(class_name):
+    return "c_" + hashlib.sha1(class_name.encode("utf-8")).hexdigest()[:16]
+
+
+def _vocabulary_key(model_name, classes):
+    payload = "\n".join([os.path.basename(model_name)] + list(classes))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class TextEmbeddingCache:
+    """モデルごとのクラス名埋め込みキャッシュ"""
+
+    def __init__(self, model_name, cache_dir=TEXT_CACHE_DIR):
+        self.model_name = model_name
+        stem = os.path.splitext(os.path.basename(model_name))[0]
+        self.path = os.path.join(cache_dir, f"{stem}.npz")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with np.load(self.path) as data:
+                return {key: data[key] for key in data.files}
+        except Exception as e:
+            logger.warning(f"[YOLO-World] Text embedding cache unreadable, rebuilding: {e}")
+            return {}
+
+    def _save(self, entries):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, **entries)
+        os.replace(tmp_path, self.path)
+
+    def set_classes(self, model, classes):
+        """
+        model.set_classes(classes) と同じ状態にする（キャッシュ済みの埋め込みを再利用）
+
+        Args:
+            model: ultralytics.YOLO（YOLO-Worldモデル）
+            classes: クラス名リスト
+        """
+        world_model = model.model
+        if not hasattr(world_model, "txt_feats") or not hasattr(world_model, "set_classes"):
+            model.set_classes(classes)
+            return
+
+        try:
+            self._set_classes_cached(model, world_model, list(classes))
+        except Exception as e:
+            logger.warning(f"[YOLO-World] Text embedding cache failed ({e}), encoding all classes")
+            model.set_classes(classes)
+
+    def _set_classes_cached(self, model, world_model, classes):
+        import torch
+
+        entries = self._load()
+        vocabulary_key = _vocabulary_key(self.model_name, classes)
+        cached_vocabulary = entries.get(_VOCABULARY_KEY)
+        full_hit = cached_vocabulary is not None and str(cached_vocabulary) == vocabulary_key
+
+        missing = [] if full_hit else [c for c in dict.fromkeys(classes) if _entry_key(c) not in entries]
+        if missing:
+            start = time.monotonic()
+            world_model.set_classes(missing)
+            encoded = world_model.txt_feats.detach().float().cpu().numpy().reshape(len(missing), -1)
+            for class_name, vector in zip(missing, encoded):
+                entries[_entry_key(class_name)] = vector
+            logger.info(f"[YOLO-World] Encoded {len(missing)}/{len(classes)} classes "
+                        f"({time.monotonic() - start:.1f}s), others from cache")
+
+        reference = world_model.txt_feats
+        feats = np.stack([entries[_entry_key(c)] for c in classes])
+        world_model.txt_feats = torch.from_numpy(feats).to(device=reference.device, dtype=reference.dtype)[None]
+        world_model.model[-1].nc = len(classes)
+        # YOLO.set_classes と同様にクラス名も差し替える
+        model.model.names = classes
+        if model.predictor:
+            model.predictor.model.names = classes
+
+        if not full_hit:
+            # 現在の語彙で使わないエントリは残す（語彙を戻した場合に再利用できる）
+            entries[_VOCABULARY_KEY] = np.array(vocabulary_key)
+            self._save(entries)
+        else:
+            logger.info(f"[YOLO-World] Loaded {len(classes)} class embeddings from cache")